@@ -0,0 +1,159 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+import instrument
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from main import solve
+from solution import export_overview_png, OBJECTIVES
+from cache import SolutionCache
+from routing import ROUTE_ENGINES
+from utils import load_locations, get_root_name
+
+# Non-interactive batch mode: solves many location files in one process without prompting.
+# Files are spread over a worker pool, every Solution is exported with export_to_txt_file,
+# and one JSON or CSV summary of route lengths and runtimes is written at the end.
+#
+#   python batch.py Almond9832.txt Walnut2621.txt pecan1212.txt --drones 1 2 3 4 --budget 60
+#   python batch.py "inputs/*.txt" --summary solutions/summary.csv
+
+# expands files, directories (their *.txt files) and glob patterns into a de-duplicated, ordered file list
+def expand_inputs(inputs: list[str]) -> list[str]:
+    file_names = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.txt")))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+        else:
+            matches = [pattern]
+        for file_name in matches:
+            if file_name not in file_names:
+                file_names.append(file_name)
+    return file_names
+
+# Solves one file for every requested drone count and exports each Solution, returns its summary rows
+# NOTE: runs inside a pool worker, so route search uses the single-core anytime scheduler
+# NOTE: with 'stats' every row also carries the file's phase timers and solver counters
+# NOTE: with 'bundle' every Solution is also written as one .npz bundle next to its txt files
+# NOTE: with 'overview' every drone count is drawn into one multi-panel PNG per file, decimated to 'preview' points per route
+def solve_file(file_name: str, drone_counts: list[int], budget: float, output_dir: str, max_nodes: int, cache_dir: str = None, seed: int = None, stats: bool = False, objective: str = "total", balance: float = None, bundle: bool = False, overview: bool = False, preview: int = None, engine: str = "ruin") -> list[dict]:
+    if stats:
+        instrument.enable()
+        instrument.reset()
+    start_time = time.time()
+    with instrument.phase("parse"):
+        coordinates = load_locations(file_name, max_nodes=max_nodes)
+    if coordinates is None:
+        return [{"file": file_name, "error": "invalid input file"}]
+    root_file_name = get_root_name(file_name)
+    drone_counts = [num_drones for num_drones in drone_counts if num_drones <= len(coordinates)]
+
+    solve_start = time.time()
+    cache = SolutionCache(cache_dir) if cache_dir else None
+    solutions = solve(coordinates, drone_counts, budget, cache=cache, seed=seed, objective=objective, balance=balance, engine=engine)
+    solve_end = time.time()
+
+    rows = []
+    for solution in solutions:
+        # one directory per drone count so solution files of different counts never collide
+        directory = os.path.join(output_dir, f"{root_file_name}_{solution.num_drones}_drones")
+        with instrument.phase("export"):
+            txt_export_successful, txt_file_names = solution.export_to_txt_file(directory, root_file_name)
+            npz_export_successful, npz_file_name = solution.export_to_npz_file(directory, root_file_name) if bundle else (False, None)
+        rows.append({
+            "file": file_name,
+            "num_locations": solution.num_locations,
+            "num_drones": solution.num_drones,
+            "total_route_len": solution.total_route_len,
+            "makespan": solution.makespan,
+            "drone_routes_len": solution.drone_routes_len,
+            "servings_per_drone": solution.servings_per_drone,
+            "landing_pads": [[pad.get_x(), pad.get_y()] for pad in solution.landing_pads],
+            "solution_files": txt_file_names if txt_export_successful else [],
+            "bundle_file": npz_file_name if npz_export_successful else None,
+            "parse_time": solve_start - start_time,
+            "solve_time": solve_end - solve_start,
+            "total_time": time.time() - start_time,
+        })
+    if overview and len(solutions) > 0:
+        # rendered headless on a bare Figure, so pool workers need no display
+        with instrument.phase("export"):
+            overview_export_successful, overview_file_name = export_overview_png(solutions, output_dir, root_file_name, coordinates, preview)
+        for row in rows:
+            row["overview_file"] = overview_file_name if overview_export_successful else None
+    if stats:
+        for row in rows:
+            row["stats"] = instrument.report()
+    return rows
+
+def write_summary(rows: list[dict], file_name: str):
+    directory = os.path.dirname(file_name)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if file_name.endswith(".csv"):
+        fields = ["file", "num_locations", "num_drones", "total_route_len", "makespan", "drone_routes_len", "servings_per_drone", "landing_pads", "solution_files", "bundle_file", "overview_file", "parse_time", "solve_time", "total_time", "stats", "error"]
+        with open(file_name, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            for row in rows:
+                # list and dict columns are stored as JSON so the CSV stays one row per (file, drone count)
+                writer.writerow({key: json.dumps(value) if isinstance(value, (list, dict)) else value for key, value in row.items()})
+    else:
+        with open(file_name, "w") as file:
+            json.dump(rows, file, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many location files without prompting")
+    parser.add_argument("inputs", nargs="+", help="location files, directories of .txt files, or glob patterns")
+    parser.add_argument("--drones", type=int, nargs="+", default=[1, 2, 3, 4], choices=[1, 2, 3, 4], help="drone counts to solve for (default 1 2 3 4)")
+    parser.add_argument("--budget", type=float, default=60.0, help="seconds per file, clustering and landing pad placement included (default 60)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="files solved at the same time (default: one per core)")
+    parser.add_argument("--output-dir", default="solutions", help="directory solution files are written to (default solutions)")
+    parser.add_argument("--summary", default=None, help="summary file, .json or .csv (default <output-dir>/summary.json)")
+    parser.add_argument("--max-nodes", type=int, default=4096, help="largest number of locations accepted per file (default 4096)")
+    parser.add_argument("--cache-dir", default=".solution_cache", help="directory of cached solutions (default .solution_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="always solve from scratch and do not store the results")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, every file is solved with the same seed (default: random)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="total", help="minimize the total route length or the longest route (makespan) (default total)")
+    parser.add_argument("--engine", choices=ROUTE_ENGINES, default="ruin", help="route search: ruin and recreate on the best route, or independent randomized restarts (default ruin)")
+    parser.add_argument("--balance", type=float, default=None, help="cap every drone at (1 + BALANCE) times an even share of the locations (default: no cap)")
+    parser.add_argument("--overview", action="store_true", help="also render every drone count of a file side by side in one PNG")
+    parser.add_argument("--preview", type=int, default=None, metavar="POINTS", help="draw at most POINTS vertices per route in the overview PNG")
+    parser.add_argument("--bundle", action="store_true", help="also write every solution as one .npz bundle (routes, pads and lengths)")
+    parser.add_argument("--stats", action="store_true", help="add phase timers and solver counters to every summary row")
+    args = parser.parse_args()
+    if args.balance is not None and args.balance < 0:
+        print("ERROR: --balance must be 0 or more")
+        exit()
+
+    file_names = expand_inputs(args.inputs)
+    if len(file_names) == 0:
+        print("ERROR: No input files found")
+        exit()
+    summary_file = args.summary or os.path.join(args.output_dir, "summary.json")
+    drone_counts = sorted(set(args.drones))
+
+    print(f"Solving {len(file_names)} file(s) with {min(args.workers, len(file_names))} worker(s)")
+    rows_by_file = {}
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(file_names))) as executor:
+        cache_dir = None if args.no_cache else args.cache_dir
+        futures = {executor.submit(solve_file, file_name, drone_counts, args.budget, args.output_dir, args.max_nodes, cache_dir, args.seed, args.stats, args.objective, args.balance, args.bundle, args.overview, args.preview, args.engine): file_name for file_name in file_names}
+        for future in as_completed(futures):
+            file_name = futures[future]
+            rows_by_file[file_name] = future.result()
+            for row in rows_by_file[file_name]:
+                if "error" in row:
+                    print(f"{file_name}: {row['error']}")
+                else:
+                    print(f"{file_name}: {row['num_drones']} drone(s), total route {row['total_route_len']:.1f} meters, longest {row['makespan']:.1f} meters ({row['total_time']:.1f}s)")
+
+    # summary keeps the order the files were given in
+    rows = [row for file_name in file_names for row in rows_by_file[file_name]]
+    write_summary(rows, summary_file)
+    print(f"Summary written to {summary_file}")
+
+if __name__ == "__main__":
+    main()
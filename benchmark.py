@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import instrument
+from coordinate import Coordinate
+from pointset import PointSet
+from main import find_clusterings, find_solutions, find_routes
+from placement import optimize_landing_pads
+from routing import ROUTE_ENGINES
+from solution import create_solution
+from utils import load_locations, generate_circle_points, coordinates_to_array, make_rng, spawn_seeds
+
+# Quality-vs-time benchmark of the clustering and routing pipeline.
+# Runs the bundled location files and synthetic circle inputs at a fixed seed and budget, records wall time,
+# k-means iterations, routes built per second and total route length per drone count, writes them as JSON
+# and compares them against a stored baseline so solver regressions show up before they ship.
+#
+#   python benchmark.py                                  # run and compare against benchmark_baseline.json
+#   python benchmark.py --cases pecan1212 --budget 1     # quick subset
+#   python benchmark.py --save-baseline                  # accept the current results as the new baseline
+#   python benchmark.py --max-routes 200                 # fixed search per cluster, compares route lengths only
+#
+# NOTE: route search always runs on one core (the anytime scheduler), so results do not depend on the core count.
+# Route lengths still depend on how much search fits in the budget, so compare baselines made on the same machine.
+# With --max-routes every cluster gets the same number of routes (ruin and recreate iterations) however busy the
+# machine is, so route lengths repeat exactly and the timings are reported but never counted as regressions.
+
+BUNDLED_FILES = ["pecan1212.txt", "Walnut2621.txt", "Almond9832.txt"]
+
+# name: (circle centers, radius, points per circle)
+SYNTHETIC_CASES = {
+    "circles-4x300": ([(0, 0), (100, 0), (0, 100), (100, 100)], 20, 300),
+    "circles-3x1000": ([(0, 0), (60, 40), (120, 0)], 30, 1000),
+}
+
+# points on the circles of a synthetic case, reproducible from 'seed'
+def make_synthetic(centers: list[tuple[float, float]], radius, num_points, seed) -> PointSet:
+    rng = make_rng(seed)
+    arrays = []
+    for x, y in centers:
+        xs, ys = generate_circle_points(Coordinate(x, y), radius, num_points, rng)
+        arrays.append(np.column_stack((xs, ys)))
+    return PointSet(np.concatenate(arrays))
+
+# (name, PointSet) of every benchmark case, optionally only those named in 'names'
+def load_cases(names: list[str], seed) -> list[tuple[str, PointSet]]:
+    cases = []
+    for file_name in BUNDLED_FILES:
+        name = file_name[:-4]
+        if names and name not in names:
+            continue
+        # the bundled files are the reference inputs, so the location limit does not apply to them
+        coordinates = load_locations(file_name, max_nodes=float('inf'))
+        if coordinates is not None:
+            cases.append((name, coordinates))
+    for name, (centers, radius, num_points) in SYNTHETIC_CASES.items():
+        if names and name not in names:
+            continue
+        cases.append((name, make_synthetic(centers, radius, num_points, seed)))
+    return cases
+
+# Clusters and routes one case for every drone count, returns one result row per drone count
+# NOTE: 'budget' is seconds of route search per cluster, so n drones get n * budget seconds
+# NOTE: 'max_routes' replaces the budget with a fixed number of routes per cluster and lets pad placement run to the end
+def run_case(name: str, coordinates: PointSet, drone_counts: list[int], budget: float, seed, engine: str = "ruin", max_routes: int = None) -> list[dict]:
+    points = coordinates_to_array(coordinates)
+    rows = []
+    for num_drones, drone_seed in zip(drone_counts, spawn_seeds(seed, len(drone_counts))):
+        cluster_seed, route_seed = spawn_seeds(drone_seed, 2)
+        instrument.reset()
+        start_time = time.perf_counter()
+        clusterings = find_clusterings(points, [num_drones], seed=cluster_seed)
+        kmeans_end = time.perf_counter()
+        kmeans_iterations = instrument.counters["kmeans_iterations"]
+        if max_routes is None:
+            solution = find_solutions(clusterings, coordinates, budget * num_drones, num_workers=1, seed=route_seed, engine=engine)[0]
+        else:
+            centers, clusters = clusterings[0]
+            results = find_routes(centers, clusters, coordinates, None, 0.10, seed=route_seed, engine=engine, max_routes=max_routes)
+            solution = create_solution(len(coordinates), centers, clusters, results)
+        route_end = time.perf_counter()
+        # every ruin and recreate iteration also ends in one complete candidate route
+        routes_built = instrument.counters["routes_built"] + instrument.counters["ruin_recreate_iterations"]
+        solution = optimize_landing_pads(solution, coordinates, time_budget=1.0 if max_routes is None else float('inf'))
+        end_time = time.perf_counter()
+        route_time = route_end - kmeans_end
+        rows.append({
+            "case": name,
+            "num_locations": len(coordinates),
+            "num_drones": num_drones,
+            "wall_time": end_time - start_time,
+            "kmeans_time": kmeans_end - start_time,
+            "kmeans_iterations": kmeans_iterations,
+            "route_time": route_time,
+            "routes_built": routes_built,
+            "routes_per_second": routes_built / max(route_time, 1e-9),
+            "total_route_len": solution.total_route_len,
+            "makespan": solution.makespan,
+        })
+    return rows
+
+# Compares result rows against baseline rows of the same case and drone count, returns one message per regression
+# NOTE: route length may grow by 'length_tolerance' and speeds may drop by 'speed_tolerance' (fractions) before it counts
+# NOTE: 'check_speed' off compares route lengths only
+def compare(rows: list[dict], baseline_rows: list[dict], length_tolerance: float = 0.01, speed_tolerance: float = 0.25, check_speed: bool = True) -> list[str]:
+    baseline = {(row["case"], row["num_drones"]): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        key = (row["case"], row["num_drones"])
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        label = f"{row['case']} with {row['num_drones']} drone(s)"
+        if row["total_route_len"] > base["total_route_len"] * (1 + length_tolerance):
+            regressions.append(f"{label}: total route {row['total_route_len']:.1f} vs baseline {base['total_route_len']:.1f} meters")
+        if not check_speed:
+            continue
+        if row["routes_per_second"] < base["routes_per_second"] * (1 - speed_tolerance):
+            regressions.append(f"{label}: {row['routes_per_second']:.0f} routes/s vs baseline {base['routes_per_second']:.0f}")
+        if row["kmeans_time"] > base["kmeans_time"] * (1 + speed_tolerance) + 0.05:
+            regressions.append(f"{label}: k-means took {row['kmeans_time']:.2f}s vs baseline {base['kmeans_time']:.2f}s")
+    return regressions
+
+def write_results(results: dict, file_name: str):
+    directory = os.path.dirname(file_name)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_name, "w") as file:
+        json.dump(results, file, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clustering and route search against a stored baseline")
+    parser.add_argument("--cases", nargs="+", default=None, help=f"cases to run (default: all of {', '.join([file_name[:-4] for file_name in BUNDLED_FILES] + list(SYNTHETIC_CASES))})")
+    parser.add_argument("--drones", type=int, nargs="+", default=[1, 2, 3, 4], choices=[1, 2, 3, 4], help="drone counts to solve for (default 1 2 3 4)")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds of route search per cluster (default 2)")
+    parser.add_argument("--max-routes", type=int, default=None, help="routes (ruin and recreate iterations) per cluster instead of --budget, so route lengths do not depend on machine load")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    parser.add_argument("--engine", choices=ROUTE_ENGINES, default="ruin", help="route search engine (default ruin)")
+    parser.add_argument("--output", default="benchmark_results.json", help="results file (default benchmark_results.json)")
+    parser.add_argument("--baseline", default=None, help="baseline file to compare against (default benchmark_baseline.json, benchmark_baseline_routes.json with --max-routes)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file instead of comparing")
+    parser.add_argument("--length-tolerance", type=float, default=0.01, help="allowed relative growth of total route length (default 0.01)")
+    parser.add_argument("--speed-tolerance", type=float, default=0.25, help="allowed relative slowdown of k-means and route building (default 0.25)")
+    args = parser.parse_args()
+    if args.max_routes is not None and args.max_routes < 1:
+        print("ERROR: --max-routes must be at least 1")
+        exit()
+    if args.baseline is None:
+        args.baseline = "benchmark_baseline.json" if args.max_routes is None else "benchmark_baseline_routes.json"
+
+    cases = load_cases(args.cases, args.seed)
+    if len(cases) == 0:
+        print("ERROR: No benchmark cases found")
+        exit()
+    drone_counts = sorted(set(args.drones))
+    settings = {"budget": args.budget, "seed": args.seed, "engine": args.engine}
+    if args.max_routes is not None:
+        # the route limit replaces the budget
+        del settings["budget"]
+        settings["max_routes"] = args.max_routes
+
+    # only the cheap counters, counting every distance would slow down the routes being timed
+    instrument.enable(distances=False)
+    rows = []
+    for name, coordinates in cases:
+        for row in run_case(name, coordinates, drone_counts, args.budget, args.seed, args.engine, args.max_routes):
+            rows.append(row)
+            print(f"{name}: {row['num_drones']} drone(s), total route {row['total_route_len']:.1f} meters, "
+                  f"k-means {row['kmeans_iterations']} iterations in {row['kmeans_time']:.2f}s, {row['routes_per_second']:.0f} routes/s")
+    instrument.disable()
+
+    results = {"settings": settings, "drone_counts": drone_counts, "results": rows}
+    write_results(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.isfile(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline, "r") as file:
+        baseline = json.load(file)
+    if baseline["settings"] != settings:
+        print(f"ERROR: {args.baseline} was recorded with different settings {baseline['settings']}")
+        exit(1)
+    regressions = compare(rows, baseline["results"], args.length_tolerance, args.speed_tolerance, check_speed=args.max_routes is None)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if len(regressions) > 0:
+        exit(1)
+    print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
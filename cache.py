@@ -0,0 +1,138 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import numpy as np
+from coordinate import Coordinate
+from solution import Solution
+
+# Persistent on-disk Solution cache.
+# Entries are JSON files keyed by a hash of the parsed point array plus (num_drones, seed, budget, route engine), so a rerun
+# with the same input and settings returns instantly. The best entry for an input and drone count, whatever
+# its settings, can also seed a new search as its incumbent. The directory is kept under 'max_bytes' by
+# evicting the least recently used entries (file modification time doubles as the access time).
+
+# content hash of a parsed (N, 2) point array
+def hash_points(points: np.ndarray) -> str:
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    digest = hashlib.sha256(str(points.shape).encode())
+    digest.update(points.tobytes())
+    return digest.hexdigest()
+
+def solution_to_dict(solution: Solution) -> dict:
+    return {
+        "num_drones": solution.num_drones,
+        "num_locations": solution.num_locations,
+        "total_route_len": solution.total_route_len,
+        "landing_pads": [list(pad.loc) for pad in solution.landing_pads],
+        "servings_per_drone": solution.servings_per_drone,
+        "drone_routes_len": solution.drone_routes_len,
+        "drone_routes": solution.drone_routes,
+    }
+
+# Checks a stored entry the way Solution does, so a bad entry is reported here instead of ending the run
+def valid_solution_dict(data: dict, num_locations: int) -> bool:
+    num_drones = data["num_drones"]
+    if not isinstance(num_drones, int) or num_drones < 1 or num_drones > 4 or data["num_locations"] != num_locations:
+        return False
+    figures = [data["landing_pads"], data["servings_per_drone"], data["drone_routes_len"], data["drone_routes"]]
+    if any(len(figure) != num_drones for figure in figures) or data["total_route_len"] < 0:
+        return False
+    if any(len(pad) != 2 for pad in data["landing_pads"]) or len(set(Coordinate(x, y) for x, y in data["landing_pads"])) != num_drones:
+        return False
+    if any(len(route) != servings for route, servings in zip(data["drone_routes"], data["servings_per_drone"])):
+        return False
+    # every location exactly once: as many route points as locations, all distinct and all in range
+    all_route_points = sum(data["drone_routes"], [])
+    if len(all_route_points) != num_locations or len(set(all_route_points)) != num_locations:
+        return False
+    return all(isinstance(idx, int) and 0 <= idx < num_locations for idx in all_route_points)
+
+def solution_from_dict(data: dict) -> Solution:
+    landing_pads = [Coordinate(x, y) for x, y in data["landing_pads"]]
+    return Solution(data["num_drones"], data["num_locations"], data["total_route_len"], landing_pads, data["servings_per_drone"], data["drone_routes_len"], data["drone_routes"])
+
+# (landing pads, clusters) pair of a Solution, in the shape find_clusterings returns
+def clustering_from_solution(solution: Solution) -> tuple[list[Coordinate], dict[int, list[int]]]:
+    return solution.landing_pads, {i: sorted(route) for i, route in enumerate(solution.drone_routes)}
+
+# <points hash>_<drone count and mode>_<settings hash>.json, see SolutionCache._file_name
+ENTRY_NAME = re.compile(r"[0-9a-f]{64}_[^_]+_[0-9a-f]{16}\.json")
+
+class SolutionCache:
+
+    def __init__(self, directory: str = ".solution_cache", max_bytes: int = 64*1024*1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    # NOTE: 'mode' names a non-default objective or clustering, its entries never mix with the default ones
+    def _file_name(self, points_hash: str, num_drones: int, seed, budget, mode: str = None, engine: str = None) -> str:
+        settings = hashlib.sha256(json.dumps([seed, budget, engine]).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{points_hash}_{self._tag(num_drones, mode)}_{settings}.json")
+
+    def _tag(self, num_drones: int, mode: str = None) -> str:
+        return str(num_drones) if mode is None else f"{num_drones}-{mode}"
+
+    # NOTE: an entry that is malformed or whose route lengths do not match 'points' (edited or stale) is ignored
+    def _read(self, file_name: str, points: np.ndarray) -> Solution:
+        try:
+            with open(file_name, "r") as file:
+                data = json.load(file)
+            if not valid_solution_dict(data, len(points)):
+                return None
+            solution = solution_from_dict(data)
+            if not solution.route_lengths_match(points):
+                return None
+            # touching the entry marks it as recently used
+            os.utime(file_name)
+            return solution
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    # cached Solution for exactly this input and these settings, or None
+    def get(self, points: np.ndarray, num_drones: int, seed=None, budget=None, mode: str = None, engine: str = None) -> Solution:
+        file_name = self._file_name(hash_points(points), num_drones, seed, budget, mode, engine)
+        if not os.path.isfile(file_name):
+            return None
+        return self._read(file_name, points)
+
+    # best cached Solution under 'objective' for this input, drone count and mode under any settings, or None
+    def best_for(self, points: np.ndarray, num_drones: int, mode: str = None, objective: str = "total") -> Solution:
+        best = None
+        for file_name in glob.glob(os.path.join(self.directory, f"{hash_points(points)}_{self._tag(num_drones, mode)}_*.json")):
+            solution = self._read(file_name, points)
+            if solution is not None and (best is None or solution.objective(objective) < best.objective(objective)):
+                best = solution
+        return best
+
+    def put(self, points: np.ndarray, num_drones: int, seed, budget, solution: Solution, mode: str = None, engine: str = None):
+        file_name = self._file_name(hash_points(points), num_drones, seed, budget, mode, engine)
+        # write then rename so a crash never leaves a half-written entry behind
+        with open(file_name + ".tmp", "w") as file:
+            json.dump(solution_to_dict(solution), file)
+        os.replace(file_name + ".tmp", file_name)
+        self._evict()
+
+    # removes least recently used entries until the cache fits in max_bytes
+    # NOTE: only files named like entries count, so other files in a shared directory are never touched
+    def _evict(self):
+        entries = []
+        for file_name in glob.glob(os.path.join(self.directory, "*_*_*.json")):
+            if ENTRY_NAME.fullmatch(os.path.basename(file_name)) is None:
+                continue
+            try:
+                stat = os.stat(file_name)
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+            except OSError:
+                continue
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(file_name)
+                total_bytes -= size
+            except OSError:
+                pass
@@ -0,0 +1,57 @@
+import numpy as np
+from spatial import ClusterDistances
+
+# Exact routes for small clusters.
+# Held-Karp dynamic programming over bitmask subsets gives the provably shortest closed route from the landing
+# pad through every point of the cluster, so small clusters need no randomized search at all.
+# NOTE: time and memory grow as 2^n * n, 12 points is 4096 subsets and solves in under a tenth of a second
+
+EXACT_MAX_SIZE = 12
+
+def can_solve_exactly(cluster_size: int) -> bool:
+    return cluster_size <= EXACT_MAX_SIZE
+
+# Shortest closed route over the cluster, returned as coordinate indexes with its total distance (pad legs included)
+def solve_exact(distances: ClusterDistances) -> tuple[list[int], float]:
+    n = distances.size
+    if n <= 2:
+        # with the pad, 2 or fewer points only form one cycle
+        local_route = list(range(n))
+        return distances.indexes[local_route].tolist(), distances.route_length(local_route)
+
+    diff = distances.points[:, np.newaxis, :] - distances.points[np.newaxis, :, :]
+    matrix = np.sqrt(np.square(diff).sum(axis=2))
+    nodes = np.arange(n)
+    bits = 1 << nodes
+
+    # cost[mask, j]: shortest path that leaves the pad, visits exactly the points in 'mask' and ends at j
+    num_masks = 1 << n
+    cost = np.full((num_masks, n), np.inf)
+    parent = np.full((num_masks, n), -1, dtype=np.int8)
+    cost[bits, nodes] = distances.pad_distances
+
+    # masks only ever grow, so walking them in increasing order finishes every subset before it is extended
+    for mask in range(1, num_masks - 1):
+        row = cost[mask]
+        # cheapest way to step from any end point j of this subset to every point k
+        extended = row[:, np.newaxis] + matrix
+        best_from = np.argmin(extended, axis=0)
+        best_cost = extended[best_from, nodes]
+        outside = nodes[(mask & bits) == 0]
+        new_masks = mask | bits[outside]
+        better = best_cost[outside] < cost[new_masks, outside]
+        cost[new_masks[better], outside[better]] = best_cost[outside[better]]
+        parent[new_masks[better], outside[better]] = best_from[outside[better]]
+
+    # close the route back to the pad and walk the parents back from the best last point
+    full = num_masks - 1
+    last = int(np.argmin(cost[full] + distances.pad_distances))
+    local_route = []
+    mask = full
+    while last >= 0:
+        local_route.append(last)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    local_route.reverse()
+    return distances.indexes[local_route].tolist(), distances.route_length(local_route)
@@ -0,0 +1,128 @@
+import os
+import re
+import time
+import numpy as np
+from coordinate import Coordinate
+from pointset import PointSet
+from solution import Solution, create_solution
+from kmeans import k_means_labels
+from spatial import ClusterDistances
+from local_search import improve_route
+from placement import place_pad
+from tour import closed_route_length, RouteCosts
+from utils import convert_solution_list, array_to_coordinates
+
+# Incremental re-solve.
+# Takes a previous Solution (e.g. loaded back from its exported _SOLUTION_ files) and a delta of added and
+# removed locations. Points that stay keep their route and its order, so earlier landing pad placement and
+# boundary moves are not undone. Added points join the cluster k-means gives them when warm-started from the
+# old routes' centroids, are inserted at their cheapest position, and only the changed parts of each route are
+# polished with local search before its pad moves back onto it. Routes the delta does not touch are kept as they were.
+
+# finds the {root}_{drone}_SOLUTION_{length}.txt files of one exported Solution, ordered by drone number
+def find_solution_files(directory: str, root_file_name: str) -> list[str]:
+    pattern = re.compile(re.escape(root_file_name) + r"_(\d+)_SOLUTION_\d+\.txt$")
+    matches = []
+    for file_name in os.listdir(directory):
+        match = pattern.match(file_name)
+        if match:
+            matches.append((int(match.group(1)), os.path.join(directory, file_name)))
+    matches.sort()
+    if len(set(drone for drone, _ in matches)) != len(matches):
+        print(f"ERROR: {directory} holds more than one solution for {root_file_name}")
+        return None
+    return [file_name for _, file_name in matches]
+
+# Rebuilds a Solution from its exported SOLUTION files, one per drone in drone order.
+# The files only hold routes, so each landing pad is recovered as the midpoint between its route's last and first
+# point. When the exported Solution went through landing pad placement (placement.place_pad) its pads lie on that
+# segment and the recovered routes keep their exported lengths, otherwise they can come out shorter.
+def load_solution(file_names: list[str], coordinates: PointSet) -> Solution:
+    points = coordinates.array
+    drone_routes = []
+    for file_name in file_names:
+        route = convert_solution_list(file_name)
+        if route is None:
+            return None
+        if any(idx < 0 or idx >= len(points) for idx in route):
+            print(f"ERROR: {file_name} visits a location that is not in the input")
+            return None
+        drone_routes.append(route)
+
+    centers = np.array([(points[route[-1]] + points[route[0]]) / 2 if len(route) else np.zeros(2) for route in drone_routes])
+    landing_pads = array_to_coordinates(centers)
+    clusters = {i: route for i, route in enumerate(drone_routes)}
+    results = [(route, closed_route_length(points, np.array(pad.loc), route)) for pad, route in zip(landing_pads, drone_routes)]
+    return create_solution(len(points), landing_pads, clusters, results)
+
+# Inserts each of 'new_indexes' where it lengthens the closed route (pad included) the least
+def cheapest_insertion(points: np.ndarray, pad: np.ndarray, route: list[int], new_indexes: list[int]) -> list[int]:
+    route = list(route)
+    for new_idx in new_indexes:
+        position, _ = RouteCosts(points, pad, route).cheapest_insertion(points[new_idx])
+        route.insert(position, new_idx)
+    return route
+
+# Re-solves 'previous' after removing the locations at 'removed' (indexes into 'coordinates') and appending 'added'.
+# Returns the new Solution and the new PointSet its routes index into (kept points first, in order, then 'added').
+# NOTE: 'time_budget' seconds of local search are shared between the changed clusters by size
+def resolve_incremental(previous: Solution, coordinates: PointSet, added: np.ndarray, removed: list[int], time_budget: float = 5.0, seed=None) -> tuple[Solution, PointSet]:
+    start_time = time.time()
+    removed = set(removed)
+    keep = np.array([idx for idx in range(len(coordinates)) if idx not in removed], dtype=np.intp)
+    added = np.round(np.asarray(added, dtype=np.float64).reshape(-1, 2), 3)
+    new_coordinates = PointSet(np.concatenate((coordinates.array[keep], added)))
+    points = new_coordinates.array
+    # old index -> new index, -1 for removed locations
+    new_index = np.full(len(coordinates), -1, dtype=np.intp)
+    new_index[keep] = np.arange(len(keep))
+
+    # points that stay keep their route, in their old order
+    k = previous.num_drones
+    old_routes = [[int(new_index[idx]) for idx in route] for route in previous.drone_routes]
+    routes = [[idx for idx in old_route if idx >= 0] for old_route in old_routes]
+    # Warm-start k-means from the old routes' centroids, cluster i keeps following old route i, and use it to place the added points
+    missing = [[] for _ in range(k)]
+    if len(added) > 0:
+        old_centroids = np.array([points[route].mean(axis=0) if len(route) else pad.loc for route, pad in zip(routes, previous.landing_pads)], dtype=np.float64)
+        _, labels = k_means_labels(k, points, initial_centers=old_centroids, rng=seed)
+        for idx in range(len(keep), len(points)):
+            missing[int(labels[idx])].append(idx)
+
+    # clusters that lost or gained points, the others keep their pad and route as they were
+    changed = [len(missing[cluster_idx]) > 0 or len(routes[cluster_idx]) < len(old_routes[cluster_idx]) for cluster_idx in range(k)]
+    points_left = sum(len(routes[cluster_idx]) + len(missing[cluster_idx]) for cluster_idx in range(k) if changed[cluster_idx])
+    pads = [np.array(pad.loc, dtype=np.float64) for pad in previous.landing_pads]
+    for cluster_idx in range(k):
+        if not changed[cluster_idx]:
+            continue
+        pad = pads[cluster_idx]
+        route = cheapest_insertion(points, pad, routes[cluster_idx], missing[cluster_idx])
+
+        # local search only starts from inserted points and from the neighbors of points that left the route
+        members = set(route)
+        touched = set(missing[cluster_idx])
+        old_route = old_routes[cluster_idx]
+        for position, idx in enumerate(old_route):
+            if idx < 0:
+                for neighbor_position in (position - 1, position + 1):
+                    if 0 <= neighbor_position < len(old_route) and old_route[neighbor_position] in members:
+                        touched.add(old_route[neighbor_position])
+
+        # each cluster gets its share of the time still left among the points still to be polished
+        cluster_deadline = time.time() + max(start_time + time_budget - time.time(), 0) * len(route) / max(points_left, 1)
+        points_left -= len(route)
+        if len(route) > 0:
+            distances = ClusterDistances(points, route, pad[0], pad[1])
+            route, _ = improve_route(distances, route, cluster_deadline, active=list(touched))
+        # the pad moves back onto the repaired route, where its legs are shortest
+        pads[cluster_idx], routes[cluster_idx] = place_pad(points, pad, route)
+
+    # pads are rounded like every Coordinate, a pad that would land on another one stays where it was
+    landing_pads = []
+    for pad, old_pad in zip(pads, previous.landing_pads):
+        landing_pad = Coordinate(float(pad[0]), float(pad[1]))
+        landing_pads.append(old_pad if landing_pad in landing_pads else landing_pad)
+    clusters = {cluster_idx: sorted(route) for cluster_idx, route in enumerate(routes)}
+    results = [(route, closed_route_length(points, np.array(pad.loc), route)) for pad, route in zip(landing_pads, routes)]
+    return create_solution(len(points), landing_pads, clusters, results), new_coordinates
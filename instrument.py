@@ -0,0 +1,99 @@
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Opt-in solver instrumentation: phase timers, counters and a live progress line.
+# Hot paths check 'enabled' before counting, so a disabled run only pays one attribute read per call site.
+# NOTE: timers and counters are per process, pool workers send theirs back with every result for the parent to merge()
+#
+# Counters:
+#   kmeans_iterations         Lloyd iterations summed over every restart
+#   routes_built              randomized nearest neighbor routes (_find_route and its indexed versions)
+#   nearest_queries           nearest-unvisited lookups made while building those routes
+#   best_route_improvements   times a cluster's best-so-far route got shorter
+#   local_search_moves        improving 2-opt / Or-opt moves applied
+#   ruin_recreate_iterations  ruin and recreate iterations, each one ends in a complete candidate route
+#   distance_evaluations      point-to-point distances computed by local search (only with count_distances)
+
+enabled = False
+live = False
+# counting every local search distance slows local search down, so timing runs can leave it off
+count_distances = False
+counters = Counter()
+timers = defaultdict(float)
+_progress_shown = False
+
+def enable(live_progress: bool = False, distances: bool = True):
+    global enabled, live, count_distances
+    enabled = True
+    live = live_progress
+    count_distances = distances
+
+def disable():
+    global enabled, live, count_distances
+    enabled = False
+    live = False
+    count_distances = False
+
+def reset():
+    counters.clear()
+    timers.clear()
+
+def count(name: str, amount: int = 1):
+    counters[name] += amount
+
+def add_time(name: str, seconds: float):
+    timers[name] += seconds
+
+# times the enclosed block under 'name', does nothing while disabled
+@contextmanager
+def phase(name: str):
+    if not enabled:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timers[name] += time.perf_counter() - start_time
+
+# copy of the current counts, safe to keep after reset()
+def snapshot() -> dict[str, int]:
+    return dict(counters)
+
+# structured report of every phase (seconds) and counter
+def report() -> dict[str, dict]:
+    return {"phases": dict(timers), "counters": dict(counters)}
+
+# adds a report() taken in another process (a pool worker) to this process's timers and counters
+def merge(other: dict[str, dict]):
+    for name, seconds in other["phases"].items():
+        timers[name] += seconds
+    counters.update(other["counters"])
+
+def format_report() -> str:
+    lines = ["Phase timers:"]
+    for name, seconds in timers.items():
+        lines.append(f"\t{name}: {seconds:.3f}s")
+    lines.append("Counters:")
+    for name, value in counters.items():
+        lines.append(f"\t{name}: {value}")
+    return "\n".join(lines)
+
+# rewrites one status line on stderr, only while live progress is on
+def progress(text: str):
+    global _progress_shown
+    if not live:
+        return
+    sys.stderr.write(f"\r\033[K{text}")
+    sys.stderr.flush()
+    _progress_shown = True
+
+# moves past the progress line so normal output starts on a fresh line
+def end_progress():
+    global _progress_shown
+    if _progress_shown:
+        sys.stderr.write("\n")
+        sys.stderr.flush()
+        _progress_shown = False
@@ -0,0 +1,281 @@
+import math
+import numpy as np
+import instrument
+from utils import *
+from coordinate import Coordinate
+
+# Vectorized k-means over an (N, 2) point array.
+# Mirrors main.k_means_clustering but does assignment with one broadcast distance computation
+# and the center update with np.bincount instead of per-Coordinate Python loops.
+
+# returns the (N, k) matrix of squared distances from every point to every center
+def squared_distances_to_centers(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    diff = points[:, np.newaxis, :] - centers[np.newaxis, :, :]
+    return np.einsum("nkd,nkd->nk", diff, diff)
+
+# returns the (k, 2) array of cluster means and the (k,) array of cluster sizes
+def calculate_cluster_centers(points: np.ndarray, labels: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    counts = np.bincount(labels, minlength=k)
+    sums = np.zeros((k, 2), dtype=np.float64)
+    np.add.at(sums, labels, points)
+    # avoid dividing by zero for empty clusters, the caller reseeds those
+    centers = sums / np.maximum(counts, 1)[:, np.newaxis]
+    return centers, counts
+
+# converts an (N,) label array into the {cluster_idx: [coordinate_idx, ...]} dict used by find_routes
+def labels_to_clusters(labels: np.ndarray, k: int) -> dict[int, list[int]]:
+    order = np.argsort(labels, kind="stable")
+    boundaries = np.searchsorted(labels[order], np.arange(k + 1))
+    return {i: order[boundaries[i]:boundaries[i+1]].tolist() for i in range(k)}
+
+# Calculates the sum of squared errors for all the cluster centers in one pass
+def calculate_sum_squared_error_vectorized(centers: np.ndarray, labels: np.ndarray, points: np.ndarray) -> float:
+    diff = points - centers[labels]
+    return float(np.einsum("nd,nd->", diff, diff))
+
+# Seeding strategies, each returns an (R, k, 2) array of initial centers, one set per restart
+
+# returns the (R, N) squared distances from every point to one chosen point per restart
+def _squared_distances_to_chosen(points: np.ndarray, chosen: np.ndarray) -> np.ndarray:
+    diff = points[np.newaxis, :, :] - chosen[:, np.newaxis, :]
+    return np.square(diff).sum(axis=2)
+
+# draws one index per row with probability proportional to that row's weights
+def _sample_proportional(weights: np.ndarray, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+    cumulative = np.cumsum(weights, axis=-1)
+    targets = rng.random(weights.shape[:-1] + (num_samples,)) * cumulative[..., -1:]
+    indexes = np.empty(targets.shape, dtype=np.intp)
+    for row in np.ndindex(weights.shape[:-1]):
+        indexes[row] = np.searchsorted(cumulative[row], targets[row], side="right")
+    return np.minimum(indexes, weights.shape[-1] - 1)
+
+# k distinct points chosen uniformly at random (the original main.k_means_clustering seeding)
+def seed_random(k, points: np.ndarray, num_restarts: int = 1, rng: np.random.Generator = None) -> np.ndarray:
+    rng = make_rng(rng)
+    return np.stack([points[rng.choice(len(points), k, replace=False)] for _ in range(num_restarts)])
+
+# k-means++: each new center is drawn with probability proportional to its squared distance to the nearest chosen center
+def seed_k_means_plus_plus(k, points: np.ndarray, num_restarts: int = 1, rng: np.random.Generator = None, num_candidates: int = 1) -> np.ndarray:
+    rng = make_rng(rng)
+    num_points = len(points)
+    restart_idx = np.arange(num_restarts)
+    centers = np.empty((num_restarts, k, 2), dtype=np.float64)
+    centers[:, 0] = points[rng.integers(num_points, size=num_restarts)]
+    closest = _squared_distances_to_chosen(points, centers[:, 0])
+    for center_idx in range(1, k):
+        # (R, L) candidate indexes, greedy k-means++ keeps the candidate that lowers the potential the most
+        candidates = _sample_proportional(closest, num_candidates, rng)
+        candidate_closest = np.minimum(closest[:, np.newaxis, :], np.square(points[np.newaxis, np.newaxis, :, :] - points[candidates][:, :, np.newaxis, :]).sum(axis=3))
+        best = np.argmin(candidate_closest.sum(axis=2), axis=1)
+        centers[:, center_idx] = points[candidates[restart_idx, best]]
+        closest = candidate_closest[restart_idx, best]
+    return centers
+
+# greedy k-means++: samples 2 + log(k) candidates per step and keeps the best one
+def seed_greedy_k_means_plus_plus(k, points: np.ndarray, num_restarts: int = 1, rng: np.random.Generator = None) -> np.ndarray:
+    return seed_k_means_plus_plus(k, points, num_restarts, rng, num_candidates=2 + int(np.log(k)))
+
+# farthest-first traversal: random first center, then always the point farthest from every chosen center
+def seed_farthest_first(k, points: np.ndarray, num_restarts: int = 1, rng: np.random.Generator = None) -> np.ndarray:
+    rng = make_rng(rng)
+    restart_idx = np.arange(num_restarts)
+    centers = np.empty((num_restarts, k, 2), dtype=np.float64)
+    centers[:, 0] = points[rng.integers(len(points), size=num_restarts)]
+    closest = _squared_distances_to_chosen(points, centers[:, 0])
+    for center_idx in range(1, k):
+        centers[:, center_idx] = points[np.argmax(closest, axis=1)]
+        closest = np.minimum(closest, _squared_distances_to_chosen(points, centers[restart_idx, center_idx]))
+    return centers
+
+SEEDING_STRATEGIES = {
+    "random": seed_random,
+    "kmeans++": seed_k_means_plus_plus,
+    "greedy-kmeans++": seed_greedy_k_means_plus_plus,
+    "farthest-first": seed_farthest_first,
+}
+
+def get_seeding_strategy(seeding: str):
+    if seeding not in SEEDING_STRATEGIES:
+        print(f"ERROR: Unknown seeding strategy {seeding}, choose from {', '.join(SEEDING_STRATEGIES)}")
+        exit()
+    return SEEDING_STRATEGIES[seeding]
+
+def k_means_clustering_vectorized(k, points: np.ndarray, max_iterations: int = 300, seeding: str = "random", tolerance: float = None, rng: np.random.Generator = None) -> tuple[list[Coordinate], dict[int, list[int]]]:
+    centers, labels = k_means_labels(k, points, max_iterations, seeding, tolerance, rng=rng)
+    # Same (centers, clusters) shape as main.k_means_clustering so find_routes and Solution are unchanged
+    return array_to_coordinates(centers), labels_to_clusters(labels, k)
+
+# Runs k-means and returns the raw (k, 2) center array and (N,) label array
+# NOTE: 'tolerance' switches convergence from "no label changed" to "no center moved further than tolerance"
+# NOTE: 'initial_centers' warm-starts from a (k, 2) array (e.g. previous landing pads) instead of seeding
+# NOTE: 'rng' is a numpy Generator (or seed), the same one gives the same clustering
+def k_means_labels(k, points: np.ndarray, max_iterations: int = 300, seeding: str = "random", tolerance: float = None, initial_centers: np.ndarray = None, rng: np.random.Generator = None) -> tuple[np.ndarray, np.ndarray]:
+    rng = make_rng(rng)
+    num_points = len(points)
+    labels = None
+
+    # Initialize Centers
+    if initial_centers is not None:
+        centers = np.array(initial_centers, dtype=np.float64).reshape(k, 2)
+    else:
+        centers = get_seeding_strategy(seeding)(k, points, 1, rng)[0]
+
+    for _ in range(max_iterations):
+        if instrument.enabled:
+            instrument.count("kmeans_iterations")
+        # Decide class memberships
+        new_labels = np.argmin(squared_distances_to_centers(points, centers), axis=1)
+
+        # Calculate new centers
+        old_centers = centers
+        centers, counts = calculate_cluster_centers(points, new_labels, k)
+        for cluster_idx in np.flatnonzero(counts == 0):
+            centers[cluster_idx] = points[rng.integers(num_points)]
+
+        # Convergence check
+        if tolerance is not None:
+            converged = np.max(np.square(centers - old_centers).sum(axis=1)) <= tolerance * tolerance
+        else:
+            converged = labels is not None and np.array_equal(new_labels, labels)
+        labels = new_labels
+        if converged:
+            break
+    return centers, labels
+
+# Batched multi-restart k-means.
+# Evaluates every random start at once as an (R, k, 2) array of centers against the (N, 2) point array,
+# iterating until every restart has converged and masking out the restarts that are already done.
+# Returns the (R, k, 2) centers, (R, N) labels and (R,) SSE of every restart.
+def k_means_batch(k, points: np.ndarray, num_restarts: int = 100, max_iterations: int = 300, seeding: str = "random", tolerance: float = None, rng: np.random.Generator = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = make_rng(rng)
+    num_points = len(points)
+
+    # Initialize Centers, one independent seeding per restart
+    centers = get_seeding_strategy(seeding)(k, points, num_restarts, rng)
+    labels = np.full((num_restarts, num_points), -1, dtype=np.intp)
+    active = np.ones(num_restarts, dtype=bool)
+
+    for _ in range(max_iterations):
+        active_idx = np.flatnonzero(active)
+        if active_idx.size == 0:
+            break
+        num_active = active_idx.size
+        if instrument.enabled:
+            instrument.count("kmeans_iterations", num_active)
+        active_centers = centers[active_idx]
+
+        # Decide class memberships for every active restart: ||c||^2 - 2 c.p, the ||p||^2 term
+        # is the same for every center so it does not change the argmin
+        cross = np.matmul(active_centers, points.T)
+        center_norms = np.einsum("rkd,rkd->rk", active_centers, active_centers)
+        new_labels = np.argmin(center_norms[:, :, np.newaxis] - 2 * cross, axis=1)
+
+        # Calculate new centers, offsetting labels so each restart gets its own k bins
+        flat_labels = (new_labels + (np.arange(num_active) * k)[:, np.newaxis]).ravel()
+        counts = np.bincount(flat_labels, minlength=num_active*k).reshape(num_active, k)
+        sum_x = np.bincount(flat_labels, weights=np.tile(points[:, 0], num_active), minlength=num_active*k)
+        sum_y = np.bincount(flat_labels, weights=np.tile(points[:, 1], num_active), minlength=num_active*k)
+        sums = np.stack((sum_x, sum_y), axis=1).reshape(num_active, k, 2)
+        new_centers = sums / np.maximum(counts, 1)[:, :, np.newaxis]
+        for restart_idx, cluster_idx in np.argwhere(counts == 0):
+            new_centers[restart_idx, cluster_idx] = points[rng.integers(num_points)]
+
+        # Convergence check, done restarts drop out of the next iteration
+        if tolerance is not None:
+            shifts = np.square(new_centers - active_centers).sum(axis=2)
+            converged = np.max(shifts, axis=1) <= tolerance * tolerance
+        else:
+            converged = np.all(new_labels == labels[active_idx], axis=1)
+        centers[active_idx] = new_centers
+        labels[active_idx] = new_labels
+        active[active_idx[converged]] = False
+
+    # Score every restart
+    diff = points[np.newaxis, :, :] - np.take_along_axis(centers, labels[:, :, np.newaxis], axis=1)
+    scores = np.einsum("rnd,rnd->r", diff, diff)
+    return centers, labels, scores
+
+# Adaptive restart controller.
+# Runs restarts in batches of 'batch_size' and stops once the best SSE has not improved for 'patience' restarts
+# (or 'max_restarts' is reached). Returns the best centers, labels, SSE and the number of restarts actually run.
+def k_means_adaptive_restarts(k, points: np.ndarray, max_restarts: int = 100, patience: int = 20, batch_size: int = 10, seeding: str = "kmeans++", tolerance: float = None, rng: np.random.Generator = None) -> tuple[np.ndarray, np.ndarray, float, int]:
+    rng = make_rng(rng)
+    centers_bsf = None
+    labels_bsf = None
+    objective_function = float('inf')
+    restarts_run = 0
+    since_improvement = 0
+
+    while restarts_run < max_restarts and since_improvement < patience:
+        num_restarts = min(batch_size, max_restarts - restarts_run)
+        centers, labels, scores = k_means_batch(k, points, num_restarts, seeding=seeding, tolerance=tolerance, rng=rng)
+        # Walk the batch in order so 'patience' counts individual restarts
+        for restart_idx, score in enumerate(scores):
+            restarts_run += 1
+            if score < objective_function:
+                objective_function = float(score)
+                centers_bsf = centers[restart_idx]
+                labels_bsf = labels[restart_idx]
+                since_improvement = 0
+            else:
+                since_improvement += 1
+            if since_improvement >= patience:
+                break
+    return centers_bsf, labels_bsf, objective_function, restarts_run
+
+# Capacity-constrained assignment: every point goes to its nearest center that still has room.
+# Points claim their place in order of regret (how much further their second choice is than their first),
+# so the points that would lose the most by being pushed out of their nearest cluster go first.
+def assign_with_capacity(distances: np.ndarray, capacity: int) -> np.ndarray:
+    num_points, k = distances.shape
+    preferences = np.argsort(distances, axis=1)
+    if k > 1:
+        nearest_two = np.take_along_axis(distances, preferences[:, :2], axis=1)
+        regret = nearest_two[:, 1] - nearest_two[:, 0]
+    else:
+        regret = np.zeros(num_points)
+    room = [capacity] * k
+    labels = np.empty(num_points, dtype=np.intp)
+    for point_idx in np.argsort(-regret, kind="stable").tolist():
+        for cluster_idx in preferences[point_idx].tolist():
+            if room[cluster_idx] > 0:
+                room[cluster_idx] -= 1
+                labels[point_idx] = cluster_idx
+                break
+    return labels
+
+# Balanced k-means: Lloyd iterations with the capacity-constrained assignment, so no cluster gets more than
+# 'capacity' points (default: an even share, rounded up). Returns the (k, 2) centers, (N,) labels and SSE.
+# NOTE: 'initial_centers' warm-starts from a (k, 2) array, e.g. the best unconstrained k-means centers
+def k_means_balanced(k, points: np.ndarray, capacity: int = None, max_iterations: int = 100, seeding: str = "kmeans++", initial_centers: np.ndarray = None, rng: np.random.Generator = None) -> tuple[np.ndarray, np.ndarray, float]:
+    rng = make_rng(rng)
+    num_points = len(points)
+    capacity = capacity or math.ceil(num_points / k)
+    if capacity * k < num_points:
+        print(f"ERROR: {k} drone(s) serving at most {capacity} locations each cannot serve {num_points} locations")
+        exit()
+
+    # Initialize Centers
+    if initial_centers is not None:
+        centers = np.array(initial_centers, dtype=np.float64).reshape(k, 2)
+    else:
+        centers = get_seeding_strategy(seeding)(k, points, 1, rng)[0]
+
+    labels = None
+    for _ in range(max_iterations):
+        if instrument.enabled:
+            instrument.count("kmeans_iterations")
+        # Decide class memberships, nearest center with room left
+        new_labels = assign_with_capacity(squared_distances_to_centers(points, centers), capacity)
+
+        # Calculate new centers
+        centers, counts = calculate_cluster_centers(points, new_labels, k)
+        for cluster_idx in np.flatnonzero(counts == 0):
+            centers[cluster_idx] = points[rng.integers(num_points)]
+
+        # Convergence check
+        converged = labels is not None and np.array_equal(new_labels, labels)
+        labels = new_labels
+        if converged:
+            break
+    return centers, labels, calculate_sum_squared_error_vectorized(centers, labels, points)
@@ -0,0 +1,189 @@
+import math
+import time
+from collections import deque
+import instrument
+from spatial import ClusterDistances
+
+# 2-opt / Or-opt local search for one cluster's closed route.
+# The landing pad is an extra node (local index n) so the pad-to-first and last-to-pad legs are optimized too.
+# Moves are only tried towards each node's candidate neighbors, and don't-look bits (a queue of active nodes)
+# keep the search to the parts of the tour that recently changed.
+class RouteImprover:
+
+    def __init__(self, distances: ClusterDistances, route: list[int]):
+        self.distances = distances
+        self.size = distances.size + 1
+        self.pad = distances.size
+        self.xs = distances.points[:, 0].tolist()
+        self.ys = distances.points[:, 1].tolist()
+        self.pad_distances = distances.pad_distances.tolist()
+        # the pad's neighbors are the points closest to it
+        self.neighbors = distances.candidates + [distances.pad_order[:len(distances.candidates[0])]]
+
+        # array-based tour with a position lookup, the pad always starts at position 0
+        self.tour = [self.pad] + list(route)
+        self.pos = [0] * self.size
+        for position, node in enumerate(self.tour):
+            self.pos[node] = position
+
+        # with instrumentation on, dist is swapped for a counting version so the plain one stays untouched
+        self.distance_evaluations = 0
+        if instrument.count_distances:
+            self.dist = self._counted_dist
+
+    def dist(self, a: int, b: int) -> float:
+        if a == self.pad:
+            return self.pad_distances[b]
+        if b == self.pad:
+            return self.pad_distances[a]
+        return math.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b])
+
+    def _counted_dist(self, a: int, b: int) -> float:
+        self.distance_evaluations += 1
+        return RouteImprover.dist(self, a, b)
+
+    def succ(self, node: int) -> int:
+        return self.tour[(self.pos[node] + 1) % self.size]
+
+    def pred(self, node: int) -> int:
+        return self.tour[self.pos[node] - 1]
+
+    # reverses the tour path from node 'first' forward to node 'last', flipping the shorter side of the cycle
+    def reverse(self, first: int, last: int):
+        i, j = self.pos[first], self.pos[last]
+        length = (j - i) % self.size + 1
+        if 2 * length > self.size:
+            # reversing the complement gives the same cycle with the opposite orientation
+            i, j = (j + 1) % self.size, (i - 1) % self.size
+            length = self.size - length
+        tour, pos = self.tour, self.pos
+        for _ in range(length // 2):
+            tour[i], tour[j] = tour[j], tour[i]
+            pos[tour[i]] = i
+            pos[tour[j]] = j
+            i = (i + 1) % self.size
+            j = (j - 1) % self.size
+
+    # tries every 2-opt move from node 'a', applies the first improving one and returns the touched nodes
+    def try_2_opt(self, a: int) -> list[int]:
+        for forward in (True, False):
+            b = self.succ(a) if forward else self.pred(a)
+            d_ab = self.dist(a, b)
+            for c in self.neighbors[a]:
+                d_ac = self.dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                d = self.succ(c) if forward else self.pred(c)
+                if c == b or d == a:
+                    continue
+                delta = d_ac + self.dist(b, d) - d_ab - self.dist(c, d)
+                if delta < -1e-9:
+                    if forward:
+                        self.reverse(b, c) # a b ... c d -> a c ... b d
+                    else:
+                        self.reverse(a, d) # b a ... d c -> b d ... a c
+                    return [a, b, c, d]
+        return []
+
+    # tries moving the segment of 1 to 3 nodes starting at 'a' next to one of its neighbors, in either orientation
+    def try_or_opt(self, a: int) -> list[int]:
+        for segment_len in (1, 2, 3):
+            if segment_len + 2 >= self.size:
+                break
+            segment = [a]
+            for _ in range(segment_len - 1):
+                segment.append(self.succ(segment[-1]))
+            first, last = segment[0], segment[-1]
+            p = self.pred(first)
+            n = self.succ(last)
+            removed_gain = self.dist(p, first) + self.dist(last, n) - self.dist(p, n)
+            for end, other_end in ((first, last), (last, first)):
+                for c in self.neighbors[end]:
+                    if c in segment:
+                        continue
+                    d_c_end = self.dist(c, end)
+                    if d_c_end >= removed_gain:
+                        break
+                    # insert between c and its successor or its predecessor, 'end' always sits next to c
+                    for e, c_first in ((self.succ(c), True), (self.pred(c), False)):
+                        if e in segment:
+                            continue
+                        delta = d_c_end + self.dist(other_end, e) - self.dist(c, e) - removed_gain
+                        if delta < -1e-9:
+                            self._move_segment(first, last, p, n, c, e, end, c_first)
+                            return [p, n, c, e, first, last]
+        return []
+
+    # removes edges (a, b) and (c, d) and reconnects the two paths, whichever way the tour is currently oriented
+    def two_opt_move(self, a: int, b: int, c: int, d: int):
+        if self.succ(a) != b:
+            a, b = b, a
+        if self.succ(c) != d:
+            c, d = d, c
+        self.reverse(b, c) # a b ... c d -> a c ... b d
+
+    # relinks segment first..last (between p and n) so that 'end' is adjacent to c and the other end to e
+    def _move_segment(self, first: int, last: int, p: int, n: int, c: int, e: int, end: int, c_first: bool):
+        # normalize so the insertion edge is (u, v) with v = succ(u)
+        u, v = (c, e) if c_first else (e, c)
+        # Or-opt as a sequence of 2-opt moves: p S n ... u v -> p n ... u S v
+        if u == n:
+            self.two_opt_move(p, first, n, v)
+        elif v == p:
+            self.two_opt_move(u, p, last, n)
+        else:
+            self.two_opt_move(p, first, u, v) # p u ... n last ... first v
+            self.two_opt_move(p, u, last, n) # p n ... u last ... first v
+        # flip the segment if the wrong end ended up next to u
+        want_at_u = end if c == u else (last if end == first else first)
+        at_u = first if first in (self.succ(u), self.pred(u)) else last
+        if at_u != want_at_u:
+            other = last if at_u == first else first
+            self.two_opt_move(u, at_u, other, v)
+
+    # runs until no improving move remains or 'deadline' (time.time() seconds) passes
+    # NOTE: 'active' limits the starting queue to those local nodes (plus the pad), e.g. the few that changed
+    def run(self, deadline: float, active: list[int] = None) -> tuple[list[int], float]:
+        if active is None:
+            queue = deque(range(self.size))
+            queued = [True] * self.size
+        else:
+            queue = deque(set(active) | {self.pad})
+            queued = [False] * self.size
+            for node in queue:
+                queued[node] = True
+        steps = 0
+        moves = 0
+        while queue:
+            steps += 1
+            if steps % 256 == 0 and time.time() >= deadline:
+                break
+            a = queue.popleft()
+            queued[a] = False
+            touched = self.try_2_opt(a) or self.try_or_opt(a)
+            if touched:
+                moves += 1
+            for node in touched:
+                if not queued[node]:
+                    queued[node] = True
+                    queue.append(node)
+        if instrument.enabled:
+            instrument.count("local_search_moves", moves)
+            if instrument.count_distances:
+                instrument.count("distance_evaluations", self.distance_evaluations)
+        return self.route(), self.distances.route_length(self.route())
+
+    # local route (pad removed) starting right after the pad
+    def route(self) -> list[int]:
+        start = self.pos[self.pad]
+        return self.tour[start+1:] + self.tour[:start]
+
+# Improves a route of coordinate indexes and returns the improved route and its closed length
+# NOTE: 'active' is an optional list of coordinate indexes to start the search from instead of every point
+def improve_route(distances: ClusterDistances, route: list[int], deadline: float, active: list[int] = None) -> tuple[list[int], float]:
+    if distances.size < 3:
+        local_route = distances.to_local(route)
+        return route, distances.route_length(local_route)
+    improver = RouteImprover(distances, distances.to_local(route))
+    local_route, length = improver.run(deadline, None if active is None else distances.to_local(active))
+    return distances.indexes[local_route].tolist(), length
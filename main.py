@@ -1,8 +1,19 @@
+import argparse
+import math
 import random
 import time
+import instrument
 from utils import *
 from coordinate import Coordinate
-from solution import Solution
+from solution import Solution, create_solution, export_overview_png, OBJECTIVES
+from kmeans import *
+from routing import *
+from exact import can_solve_exactly
+from parallel import find_routes_parallel, stream_routes_parallel
+from scheduler import AnytimeScheduler
+from cache import SolutionCache, clustering_from_solution
+from placement import optimize_landing_pads, optimize_makespan
+from tour import closed_route_length
 
 def calculate_cluster_center(cluster_coordinates: list[Coordinate]) -> Coordinate:
     center_x = np.average([coordinate.get_x() for coordinate in cluster_coordinates])
@@ -20,12 +31,14 @@ def assign_coordinate_to_cluster(coordinate: Coordinate, centers: list[Coordinat
     return cluster_idx
     
 
-def k_means_clustering(k, coordinates: list[Coordinate]):
+# NOTE: 'rng' is a numpy Generator (or seed), the same one gives the same clustering
+def k_means_clustering(k, coordinates: list[Coordinate], rng: np.random.Generator = None):
+    rng = make_rng(rng)
     clusters = {}
     old_clusters = None
     
     # Initialize Centers
-    centers = random.sample(coordinates, k)
+    centers = [coordinates[coordinate_idx] for coordinate_idx in rng.choice(len(coordinates), k, replace=False)]
     
     while True:
         clusters = {i: [] for i in range(k)}
@@ -39,7 +52,7 @@ def k_means_clustering(k, coordinates: list[Coordinate]):
         # Calculate new centers
         for cluster_idx, cluster_coordinate_indexes in clusters.items():
             if len(cluster_coordinate_indexes) == 0:
-                centers[cluster_idx] = random.choice(coordinates)
+                centers[cluster_idx] = coordinates[rng.integers(len(coordinates))]
             else:
                 # Retrive coordinates for a cluster using stored indexes
                 cluster_coordinates = [coordinates[coordinate_idx] for coordinate_idx in cluster_coordinate_indexes]
@@ -56,7 +69,10 @@ def k_means_clustering(k, coordinates: list[Coordinate]):
 
 # Calculates the squared error for a cluster center and the actual coordinates assigned to it
 def calculate_squared_error(center: Coordinate, coordinates: list[Coordinate]) -> float:
-    return np.sum(np.square([center.distanceTo(coordinate) for coordinate in coordinates]))
+    if len(coordinates) == 0:
+        return 0.0
+    points = np.array([coordinate.loc for coordinate in coordinates], dtype=np.float64)
+    return float(np.square(points - center.loc).sum())
 
 # Calculates the sum of squared errors for all the cluster centers
 def calculate_sum_squared_error(centers, clusters, coordinates):
@@ -68,9 +84,11 @@ def calculate_sum_squared_error(centers, clusters, coordinates):
         objective += calculate_squared_error(cluster_center, cluster_coordinates)
     return objective
 
-def _find_nearest_neighbor(target: Coordinate, neighbors: list[int], coordinate_list: list[Coordinate], skip_chance):
+def _find_nearest_neighbor(target: Coordinate, neighbors: list[int], coordinate_list: list[Coordinate], skip_chance, rng: random.Random = None):
     # NOTE: 'neighbors' is a list of indexes and needs to be converted into coordinate in coordinate_list
     # NOTE: 'skip_chance' is the probability that the nearest neighbor is skipped
+    # NOTE: 'rng' is a random.Random, the global random module is used when none is given
+    rng = rng or random
     if len(neighbors) == 0:
         return None, float('inf')
     nearest_neighbor = neighbors[0]
@@ -78,108 +96,252 @@ def _find_nearest_neighbor(target: Coordinate, neighbors: list[int], coordinate_
     for coord_idx in neighbors:
         dist = target.distanceTo(coordinate_list[coord_idx])
         # Update (or possibly skip) if distance is shorter than best so far
-        if dist < dist_bsf and random.random() > skip_chance:
+        if dist < dist_bsf and rng.random() > skip_chance:
             dist_bsf = dist
             nearest_neighbor = coord_idx
     # Returns the index of the nearest_neighbor and the distance to it
     return nearest_neighbor, dist_bsf
 
-def _find_route(start, coordinate_indexes, coordinate_list, chance):
-    # Include distance from landing pad to first point in route
-    first, distance = _find_nearest_neighbor(start, coordinate_indexes, coordinate_list, chance)
+def _find_route(start, coordinate_indexes, coordinate_list, chance, rng: random.Random = None):
+    if instrument.enabled:
+        instrument.count("routes_built")
+    first, _ = _find_nearest_neighbor(start, coordinate_indexes, coordinate_list, chance, rng)
     route = [first]
     visited = set(route)
     while len(visited) < len(coordinate_indexes):
         # Only look for neighbors in at indexes that haven't been used yet
         unvisited_neighbors = [coordinate_index for coordinate_index in coordinate_indexes if coordinate_index not in visited]
-        nn, nn_dist = _find_nearest_neighbor(coordinate_list[route[-1]], unvisited_neighbors, coordinate_list, chance)
+        nn, _ = _find_nearest_neighbor(coordinate_list[route[-1]], unvisited_neighbors, coordinate_list, chance, rng)
         # No neighbors found
         if nn is None:
             break
-        distance += nn_dist
         route.append(nn)
         visited.add(nn)
-    # Add distance from last point in route to landing pad
-    distance += start.distanceTo(coordinate_list[route[-1]])
+    if instrument.enabled:
+        instrument.count("nearest_queries", len(route))
+    # Total distance is scored once at the end, pad-to-first and last-to-pad legs included
+    points = np.array([coordinate_list[coord_idx].loc for coord_idx in route], dtype=np.float64)
+    distance = closed_route_length(points, np.array(start.loc), np.arange(len(route)))
     # Return the indexes of the coordinates in the route, and the total distance of the route
     return route, distance
 
-def find_routes(centers, clusters, coordinates, duration, chance):
+# NOTE: 'seed' is split into one independent stream per cluster
+# NOTE: small clusters are solved exactly at once, their 'duration' is shared by the clusters that still need searching
+# NOTE: 'engine' is one of ROUTE_ENGINES
+# NOTE: 'max_routes' caps the routes (or ruin and recreate iterations) of every cluster, with duration=None it is the
+# only limit, so the routes depend on 'seed' alone and not on how fast the machine is
+def find_routes(centers, clusters, coordinates, duration, chance, improve_share=0.25, seed=None, engine="ruin", max_routes=None):
+    if duration is None and max_routes is None:
+        print("ERROR: Route search needs a duration or a route limit")
+        return None
     results = []
-    for cluster_idx, cluster_coords in clusters.items():
-        start_time = time.time()
-        route_bsf = None
-        distance_bsf = float('inf')
-        # search for better solutions w/ augmented nearest neighbor for 'duration' seconds
-        while time.time() < start_time + duration:
-            route, distance = _find_route(centers[cluster_idx], cluster_coords, coordinates, chance)
-            # Keep the route with the shortest distance
-            if distance < distance_bsf:
-                distance_bsf = distance
-                route_bsf = route
-        results.append((route_bsf, distance_bsf))
+    points = coordinates_to_array(coordinates)
+    num_searched = sum(not can_solve_exactly(len(cluster_coords)) for cluster_coords in clusters.values())
+    cluster_duration = duration * len(clusters) / max(num_searched, 1) if duration is not None else None
+    for (cluster_idx, cluster_coords), cluster_seed in zip(clusters.items(), spawn_seeds(seed, len(clusters))):
+        with instrument.phase(f"route search/{len(clusters)} drones/cluster {cluster_idx+1}"):
+            results.append(find_cluster_route(points, centers[cluster_idx], cluster_coords, cluster_duration, chance, improve_share, rng=make_rng(cluster_seed), max_routes=max_routes, engine=engine))
     # Returns a list of tuples, where the first value is the route for the cluster and the second value is the total distance of the route
     return results
 
+# Best clustering for every drone count in 'drone_counts', as (landing pads, clusters) pairs
+# NOTE: with 'balance' no drone serves more than (1 + balance) times an even share of the locations
+def find_clusterings(points: np.ndarray, drone_counts, seed=None, balance: float = None) -> list[tuple[list[Coordinate], dict[int, list[int]]]]:
+    clusterings = []
+    for num_drones, drone_seed in zip(drone_counts, spawn_seeds(seed, len(drone_counts))):
+        rng = make_rng(drone_seed)
+        # Run up to 100 k-means++ seeded trials in batches, stopping once the best clusters stop improving
+        centers, labels, objective_function, _ = k_means_adaptive_restarts(num_drones, points, max_restarts=100, patience=20, seeding="kmeans++", rng=rng)
+        if balance is not None:
+            # the best unconstrained centers are the starting point for the capacity-constrained ones
+            capacity = math.ceil((1 + balance) * len(points) / num_drones)
+            centers, labels, objective_function = k_means_balanced(num_drones, points, capacity, initial_centers=centers, rng=rng)
+        clusterings.append((array_to_coordinates(centers), labels_to_clusters(labels, num_drones)))
+    return clusterings
+
+# Routes every clustering within 'wall_budget' seconds and returns one Solution per clustering
+# chance is probability of skipping best neighbor
+# 'incumbents' optionally holds earlier routes (one list per clustering, or None) for the search to start from
+# 'engine' is one of ROUTE_ENGINES, how each cluster's search time is spent
+def find_solutions(clusterings, coordinates: PointSet, wall_budget, num_workers=1, chance=0.10, incumbents=None, seed=None, engine="ruin") -> list[Solution]:
+    num_coordinates = len(coordinates)
+    if num_workers > 1:
+        all_results = find_routes_parallel(clusterings, coordinates, wall_budget, chance=chance, max_workers=num_workers, incumbents=incumbents, seed=seed, engine=engine)
+        return [create_solution(num_coordinates, centers, clusters, results) for (centers, clusters), results in zip(clusterings, all_results)]
+    # A single core gains nothing from a pool, share one deadline across clusters and stop early once they plateau
+    scheduler = AnytimeScheduler(clusterings, coordinates, chance=chance, incumbents=incumbents, seed=seed, engine=engine)
+    return scheduler.run(time.time() + wall_budget)
+
+# Generator version of find_solutions: yields a clustering's Solution every time its best total route gets shorter
+# NOTE: stopping the iteration early ends the search
+def stream_solutions(clusterings, coordinates: PointSet, wall_budget, num_workers=1, chance=0.10, incumbents=None, seed=None, engine="ruin"):
+    num_coordinates = len(coordinates)
+    if num_workers > 1:
+        for clustering_idx, results in stream_routes_parallel(clusterings, coordinates, wall_budget, chance=chance, max_workers=num_workers, incumbents=incumbents, seed=seed, engine=engine):
+            centers, clusters = clusterings[clustering_idx]
+            yield create_solution(num_coordinates, centers, clusters, results)
+        return
+    scheduler = AnytimeScheduler(clusterings, coordinates, chance=chance, incumbents=incumbents, seed=seed, engine=engine)
+    yield from scheduler.stream(time.time() + wall_budget)
+
+# seconds of landing pad placement per drone count once the route search ends, taken out of the wall budget
+POLISH_BUDGET = 1.0
+
+# Moves the landing pads of a searched Solution off the k-means centers to where its routes are shortest
+def polish_solution(solution: Solution, coordinates: PointSet, objective: str = "total", balance: float = None, time_budget: float = POLISH_BUDGET) -> Solution:
+    with instrument.phase("landing pads"):
+        capacity = math.ceil((1 + balance) * len(coordinates) / solution.num_drones) if balance is not None else None
+        if objective == "makespan":
+            return optimize_makespan(solution, coordinates, time_budget, capacity=capacity)
+        return optimize_landing_pads(solution, coordinates, time_budget, capacity=capacity)
+
+# Solves every drone count in 'drone_counts' within 'wall_budget' seconds, clustering and landing pad placement included.
+# With a cache, drone counts already solved under the same settings return instantly and the rest start
+# their route search from the best cached routes, so improvements accumulate across runs.
+# 'seed' fixes every random choice (clustering and route search), though how far the search gets still depends on the budget.
+# 'objective' is "total" (sum of route lengths) or "makespan" (longest route), 'balance' caps each drone's share of locations.
+# 'engine' is one of ROUTE_ENGINES, how each cluster's search time is spent.
+def solve(coordinates: PointSet, drone_counts, wall_budget, num_workers=1, cache: SolutionCache = None, seed=None, objective: str = "total", balance: float = None, engine: str = "ruin") -> list[Solution]:
+    solutions = {}
+    for _, solution, final in solve_stream(coordinates, drone_counts, wall_budget, num_workers, cache, seed, objective, balance, engine):
+        if final:
+            solutions[solution.num_drones] = solution
+    return [solutions[num_drones] for num_drones in drone_counts if num_drones in solutions]
+
+# Generator version of solve, yields (elapsed seconds, Solution, final) as results become available.
+# Cached drone counts come first and are final at once. While routes are searched every improvement of a drone
+# count's best-so-far Solution follows with final=False, and once the search ends each drone count's Solution
+# with optimized landing pads follows with final=True.
+# NOTE: stopping the iteration early ends the search, its last non-final Solutions are usable but never cached
+def solve_stream(coordinates: PointSet, drone_counts, wall_budget, num_workers=1, cache: SolutionCache = None, seed=None, objective: str = "total", balance: float = None, engine: str = "ruin"):
+    start_time = time.time()
+    deadline = start_time + wall_budget
+    points = coordinates_to_array(coordinates)
+    # solutions of other objectives or clusterings are cached apart so they never stand in for each other
+    mode = None if objective == "total" and balance is None else f"{objective}-balance{balance}"
+    # one clustering stream per drone count (by position, so cache hits do not shift the others) and one for routing
+    cluster_seed, route_seed = spawn_seeds(seed, 2)
+    drone_seeds = spawn_seeds(cluster_seed, len(drone_counts))
+    clusterings = []
+    incumbents = []
+    pending = []
+    for num_drones, drone_seed in zip(drone_counts, drone_seeds):
+        cached = cache.get(points, num_drones, seed, wall_budget, mode, engine) if cache else None
+        if cached is not None:
+            yield time.time() - start_time, cached, True
+            continue
+        pending.append(num_drones)
+        best = cache.best_for(points, num_drones, mode, objective) if cache else None
+        if best is not None:
+            clusterings.append(clustering_from_solution(best))
+            incumbents.append(best.drone_routes)
+        else:
+            with instrument.phase("kmeans restarts"):
+                clusterings.extend(find_clusterings(points, [num_drones], seed=drone_seed, balance=balance))
+            incumbents.append(None)
+
+    if len(pending) == 0:
+        return
+    latest = {}
+    # the search ends early enough to leave every pending drone count its landing pad placement
+    search_budget = max(deadline - time.time() - POLISH_BUDGET * len(pending), 0)
+    with instrument.phase("route search"):
+        for solution in stream_solutions(clusterings, coordinates, search_budget, num_workers, incumbents=incumbents, seed=route_seed, engine=engine):
+            latest[solution.num_drones] = solution
+            yield time.time() - start_time, solution, False
+    instrument.end_progress()
+    polish_counts = [num_drones for num_drones in pending if num_drones in latest]
+    for polish_idx, num_drones in enumerate(polish_counts):
+        # move the pads off the k-means centers to where the routes are shortest, sharing what is left of the budget
+        polish_budget = min(POLISH_BUDGET, max(deadline - time.time(), 0) / (len(polish_counts) - polish_idx))
+        solution = polish_solution(latest[num_drones], coordinates, objective, balance, polish_budget)
+        if cache:
+            cache.put(points, num_drones, seed, wall_budget, solution, mode, engine)
+        yield time.time() - start_time, solution, True
+
 def main():
+    parser = argparse.ArgumentParser(description="Drone Route(s) Finder")
+    parser.add_argument("--max-nodes", type=int, default=4096, help="largest number of locations accepted in the input file (default 4096)")
+    parser.add_argument("--no-plot", action="store_true", help="skip the PNG visualization, matplotlib is never imported")
+    parser.add_argument("--cache-dir", default=".solution_cache", help="directory of cached solutions (default .solution_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="always solve from scratch and do not store the result")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for clustering and route search (default: random)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="total", help="minimize the total route length or the longest route (makespan) (default total)")
+    parser.add_argument("--balance", type=float, default=None, help="cap every drone at (1 + BALANCE) times an even share of the locations, e.g. 0 or 0.1 (default: no cap)")
+    parser.add_argument("--engine", choices=ROUTE_ENGINES, default="ruin", help="route search: ruin and recreate on the best route, or independent randomized restarts (default ruin)")
+    parser.add_argument("--overview", action="store_true", help="also render every drone count's solution side by side in one PNG")
+    parser.add_argument("--preview", type=int, default=None, metavar="POINTS", help="draw at most POINTS vertices per route for a faster, lighter PNG")
+    parser.add_argument("--bundle", action="store_true", help="also write the chosen solution as one .npz bundle (routes, pads and lengths)")
+    parser.add_argument("--stats", action="store_true", help="print phase timers and solver counters at the end")
+    parser.add_argument("--progress", action="store_true", help="show a live progress line while routes are searched")
+    args = parser.parse_args()
+    if args.balance is not None and args.balance < 0:
+        print("ERROR: --balance must be 0 or more")
+        exit()
+    if args.stats or args.progress:
+        instrument.enable(live_progress=args.progress)
+
     print("Drone Route(s) Finder")
     # Input Handling
     input_file = input("Enter the name of the file: ")
-    if not valid_file(input_file):
+    # Validates and parses in a single read
+    with instrument.phase("parse"):
+        coordinates = load_locations(input_file, max_nodes=args.max_nodes)
+    if coordinates is None:
         exit()
 
-    coordinates = parse_input(input_file)
     input_file_root = get_root_name(input_file)
     num_coordinates = len(coordinates)
-    est_time = get_end_time()
+    max_drones = min(num_coordinates, 4)
+    drone_counts = range(1, max_drones+1)
 
-    print(f"There are {num_coordinates} nodes: Solutions will be available in five minutes ({est_time})")
+    # Cluster and find routes for 1 to 4 drones
+    # Budget is the same 20 seconds of search per cluster (one cluster per drone), spread across every core,
+    # plus the landing pad placement of every drone count once the search ends
+    num_workers = os.cpu_count() or 1
+    wall_budget = 20 * sum(drone_counts) / num_workers + POLISH_BUDGET * len(drone_counts)
+    est_time = get_end_time(wall_budget)
 
-    solutions = []
-    max_drones = min(num_coordinates, 4)
-    # Find routes for 1 to 4 drones
-    for num_drones in range(1, max_drones+1):
-        # Track best clusters
-        centers_bsf = None
-        clusters_bsf = None
-        objective_function = float('inf')
-        # Run multiple trials with random starts 
-        for _ in range(100):
-            centers, clusters = k_means_clustering(num_drones, coordinates)
-            score = calculate_sum_squared_error(centers, clusters, coordinates)
-            # Choose clusters with best (smallest) objective function
-            if score < objective_function:
-                objective_function = score
-                centers_bsf = centers
-                clusters_bsf = clusters
-        # Route Finding
-        # Duration is number of seconds to iterate, chance is probability of skipping best neighbor
-        results = find_routes(centers_bsf, clusters_bsf, coordinates, duration=20, chance=0.10)
-        
-        # Set up inputs for Solution class
-        servings_per_drone = [len(val) for val in clusters_bsf.values()]
-        drone_routes = []
-        drone_route_len = []
-        for result in results:
-            drone_routes.append(result[0])
-            drone_route_len.append(result[1])
-        total_route_len = sum(drone_route_len)
-        
-        # Create solution
-        solution = Solution(num_drones, num_coordinates, total_route_len, centers_bsf, servings_per_drone, drone_route_len, drone_routes)
-        solutions.append(solution)
+    print(f"There are {num_coordinates} nodes: Solutions will be available in about {math.ceil(wall_budget)} seconds ({est_time})")
+    print("Improved routes are shown as they are found, press Ctrl+C to stop early and choose from the best so far")
+    cache = None if args.no_cache else SolutionCache(args.cache_dir)
+    # best Solution so far per drone count, and the drone counts whose Solution is final
+    best = {}
+    final_counts = set()
+    stream = solve_stream(coordinates, drone_counts, wall_budget, num_workers, cache, args.seed, args.objective, args.balance, args.engine)
+    try:
+        for elapsed, solution, final in stream:
+            best[solution.num_drones] = solution
+            if final:
+                final_counts.add(solution.num_drones)
+            elif not instrument.live:
+                # Update command-line UI with progress, the live progress line already shows it
+                print(f"\t[{elapsed:.1f}s] {solution.num_drones} drone(s): total route {solution.total_route_len:.1f} meters, longest {solution.makespan:.1f} meters")
+    except KeyboardInterrupt:
+        stream.close()
+        instrument.end_progress()
+        print("Search stopped, continuing with the best routes found so far")
+        # the search was cut short, so these are polished here and not cached
+        for num_drones in best:
+            if num_drones not in final_counts:
+                best[num_drones] = polish_solution(best[num_drones], coordinates, args.objective, args.balance)
+    if len(best) == 0:
+        print("ERROR: The search was stopped before any solution was found")
+        exit()
+    solutions = [best[num_drones] for num_drones in drone_counts if num_drones in best]
 
-        # Update command-line UI with progress
+    for solution in solutions:
         print(solution)
 
     # Output Handling
     # TODO: Add visual route output
-    solution_choice = int(input(f"Please select your choice 1 to {max_drones}: "))
-    if solution_choice < 1 or solution_choice > max_drones:
+    solution_choice = int(input(f"Please select your choice {solutions[0].num_drones} to {solutions[-1].num_drones}: "))
+    if solution_choice not in best:
         print("Invalid choice")
         exit()
-    chosen_solution:Solution = solutions[solution_choice-1]
-    txt_export_successful, txt_file_names  = chosen_solution.export_to_txt_file("solutions", input_file_root)
+    chosen_solution:Solution = best[solution_choice]
+    with instrument.phase("export"):
+        txt_export_successful, txt_file_names  = chosen_solution.export_to_txt_file("solutions", input_file_root)
     if txt_export_successful: # successful export
         output = "Writing "
         for file_name in txt_file_names:
@@ -189,11 +351,31 @@ def main():
     else:
         print("Solution txt export unsuccessful")
 
-    png_export_successful, png_file_name = chosen_solution.export_to_png_file("solutions", input_file_root, coordinates)
-    if png_export_successful:
-        print(f"Visualization successfully exported to {png_file_name}")
-    else:
-        print(f"Visualization export unsuccessful")
+    if args.bundle:
+        with instrument.phase("export"):
+            npz_export_successful, npz_file_name = chosen_solution.export_to_npz_file("solutions", input_file_root)
+        if npz_export_successful:
+            print(f"Writing {npz_file_name} to disk")
+        else:
+            print("Solution bundle export unsuccessful")
+
+    if not args.no_plot:
+        with instrument.phase("export"):
+            png_export_successful, png_file_name = chosen_solution.export_to_png_file("solutions", input_file_root, coordinates, args.preview)
+        if png_export_successful:
+            print(f"Visualization successfully exported to {png_file_name}")
+        else:
+            print(f"Visualization export unsuccessful")
+        if args.overview:
+            with instrument.phase("export"):
+                overview_export_successful, overview_file_name = export_overview_png(solutions, "solutions", input_file_root, coordinates, args.preview)
+            if overview_export_successful:
+                print(f"Overview of every solution exported to {overview_file_name}")
+            else:
+                print(f"Overview export unsuccessful")
+
+    if args.stats:
+        print(instrument.format_report())
 
 
 if __name__ == "__main__":
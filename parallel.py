@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import time
+import instrument
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing.shared_memory import SharedMemory
+from coordinate import Coordinate
+from pointset import PointSet
+from utils import coordinates_to_array, spawn_seeds
+from routing import find_cluster_route
+from spatial import ClusterDistances
+from exact import can_solve_exactly, solve_exact
+
+# Parallel route search.
+# Every (drone count, cluster) pair is an independent job fanned out to a ProcessPoolExecutor.
+# The points live in one shared-memory (N, 2) array that workers attach to once, so jobs only
+# carry their landing pad and cluster indexes instead of pickled Coordinate lists.
+# Jobs run in short slices that are resubmitted with the cluster's best route so far, so results stream back
+# while the search goes on and stopping it never waits for more than one slice.
+
+# per-worker view of the shared point array, set by _init_worker
+_shared_memory = None
+_shared_points = None
+# per-worker ClusterDistances by job key, so later slices of a cluster skip the precomputation
+_cluster_distances = {}
+
+# NOTE: 'count_distances' is None when the parent's instrumentation is off, so workers keep theirs off too
+def _init_worker(shared_name: str, shape: tuple[int, int], count_distances: bool = None):
+    global _shared_memory, _shared_points
+    _shared_memory = SharedMemory(name=shared_name)
+    _shared_points = np.ndarray(shape, dtype=np.float64, buffer=_shared_memory.buf)
+    _cluster_distances.clear()
+    if count_distances is not None:
+        instrument.enable(distances=count_distances)
+
+# One slice of route search, returns (route, distance, instrumentation report of the slice or None)
+# NOTE: 'seed' is the slice's own SeedSequence, so results do not depend on which worker runs the slice
+# NOTE: 'key' names the cluster (clustering index, cluster index) for the per-worker distance cache
+# NOTE: 'name' labels the slice's time in the instrumentation report
+def _route_job(key: tuple[int, int], center_x: float, center_y: float, cluster_coords: list[int], duration, chance, improve_share, incumbent, seed: np.random.SeedSequence, engine: str, name: str = "cluster"):
+    instrument.reset()
+    with instrument.phase(f"route search/{name}"):
+        if key not in _cluster_distances:
+            _cluster_distances[key] = ClusterDistances(_shared_points, cluster_coords, center_x, center_y)
+        route, distance = find_cluster_route(_shared_points, Coordinate(center_x, center_y), cluster_coords, duration, chance, improve_share, incumbent, rng=np.random.default_rng(seed), engine=engine, distances=_cluster_distances[key])
+    return route, distance, instrument.report() if instrument.enabled else None
+
+# Routes for several clusterings at once, returns one find_routes-shaped result list per (centers, clusters) pair.
+# NOTE: 'wall_budget' is the wall-clock seconds for the whole search, jobs take turns in slices of at most
+# 'slice_length' seconds so every job gets an equal share of the workers' time, and spare workers run extra
+# replicas of the largest clusters.
+# 'incumbents' optionally holds earlier routes (one list per clustering, or None) for the search to start from.
+# 'seed' is split into one SeedSequence per job, so replicas of a job explore different routes.
+# 'engine' is one of routing.ROUTE_ENGINES.
+def find_routes_parallel(clusterings: list[tuple[list[Coordinate], dict[int, list[int]]]], coordinates: PointSet, wall_budget, chance, improve_share=0.25, max_workers: int = None, incumbents: list[list[list[int]]] = None, seed=None, engine: str = "ruin", slice_length: float = 2.0) -> list[list[tuple[list[int], float]]]:
+    results = [[(None, float('inf')) for _ in clusters] for _, clusters in clusterings]
+    for clustering_idx, clustering_results in stream_routes_parallel(clusterings, coordinates, wall_budget, chance, improve_share, max_workers, incumbents, seed, engine, slice_length):
+        results[clustering_idx] = clustering_results
+    return results
+
+# Generator version of find_routes_parallel: yields (clustering index, its find_routes-shaped results) as soon as
+# every cluster of that clustering has a route, and again whenever a finished slice shortens one of them.
+# NOTE: stopping the iteration early waits for the running slices only, at most 'slice_length' seconds
+def stream_routes_parallel(clusterings: list[tuple[list[Coordinate], dict[int, list[int]]]], coordinates: PointSet, wall_budget, chance, improve_share=0.25, max_workers: int = None, incumbents: list[list[list[int]]] = None, seed=None, engine: str = "ruin", slice_length: float = 2.0):
+    start_time = time.time()
+    deadline = start_time + wall_budget
+    points = coordinates_to_array(coordinates)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    results = [[(None, float('inf')) for _ in clusters] for _, clusters in clusterings]
+
+    # (clustering index, cluster index) of every job, largest clusters first so replicas go to them
+    # small clusters are solved exactly right here, so the whole budget goes to the clusters that need searching
+    jobs = []
+    for clustering_idx, (centers, clusters) in enumerate(clusterings):
+        for cluster_idx, cluster_coords in clusters.items():
+            if can_solve_exactly(len(cluster_coords)):
+                distances = ClusterDistances(points, cluster_coords, centers[cluster_idx].get_x(), centers[cluster_idx].get_y())
+                results[clustering_idx][cluster_idx] = solve_exact(distances)
+            else:
+                jobs.append((clustering_idx, cluster_idx))
+    for clustering_idx, clustering_results in enumerate(results):
+        if all(route is not None for route, _ in clustering_results):
+            yield clustering_idx, list(clustering_results)
+    if len(jobs) == 0:
+        return
+    jobs.sort(key=lambda job: len(clusterings[job[0]][1][job[1]]), reverse=True)
+    num_unique_jobs = len(jobs)
+    for replica in range(max(0, max_workers - num_unique_jobs)):
+        jobs.append(jobs[replica % num_unique_jobs])
+
+    # one SeedSequence per job, each slice of the job spawns its own child from it
+    job_seeds = spawn_seeds(seed, len(jobs))
+    if incumbents:
+        for clustering_idx, routes in enumerate(incumbents):
+            for cluster_idx, route in enumerate(routes or []):
+                if results[clustering_idx][cluster_idx][0] is None:
+                    results[clustering_idx][cluster_idx] = (route, float('inf'))
+
+    shared_memory = SharedMemory(create=True, size=max(points.nbytes, 1))
+    try:
+        np.ndarray(points.shape, dtype=np.float64, buffer=shared_memory.buf)[:] = points
+        count_distances = instrument.count_distances if instrument.enabled else None
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(shared_memory.name, points.shape, count_distances))
+        try:
+            # next slice of job 'job_idx', starting from its cluster's best route so far
+            def submit(job_idx: int):
+                clustering_idx, cluster_idx = jobs[job_idx]
+                centers, clusters = clusterings[clustering_idx]
+                center = centers[cluster_idx]
+                duration = min(slice_length, deadline - time.time())
+                incumbent = results[clustering_idx][cluster_idx][0]
+                name = f"{len(clusters)} drones/cluster {cluster_idx+1}"
+                return executor.submit(_route_job, jobs[job_idx], center.get_x(), center.get_y(), clusters[cluster_idx], duration, chance, improve_share, incumbent, job_seeds[job_idx].spawn(1)[0], engine, name)
+
+            # at most one slice per worker is in flight, the others wait their turn in job order
+            # NOTE: every cluster gets its first slice even past the deadline, so every clustering ends up with routes
+            waiting = deque(range(len(jobs)))
+            running = {}
+            started = set()
+            while len(running) < max_workers and waiting:
+                job_idx = waiting.popleft()
+                started.add(jobs[job_idx])
+                running[submit(job_idx)] = job_idx
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_idx = running.pop(future)
+                    waiting.append(job_idx)
+                    clustering_idx, cluster_idx = jobs[job_idx]
+                    route, distance, report = future.result()
+                    if report is not None:
+                        instrument.merge(report)
+                    # Keep the shortest route found by any slice of any replica
+                    if distance < results[clustering_idx][cluster_idx][1]:
+                        results[clustering_idx][cluster_idx] = (route, distance)
+                        if all(route is not None and distance < float('inf') for route, distance in results[clustering_idx]):
+                            yield clustering_idx, list(results[clustering_idx])
+                if instrument.live:
+                    _show_progress(clusterings, results, time.time() - start_time, len(running))
+                while len(running) < max_workers and waiting and (deadline - time.time() > 0.01 or jobs[waiting[0]] not in started):
+                    job_idx = waiting.popleft()
+                    started.add(jobs[job_idx])
+                    running[submit(job_idx)] = job_idx
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+# one status line like AnytimeScheduler.show_progress: elapsed time, slices in flight, routes built by the workers
+# and the best total route of every clustering whose clusters all have a route
+def _show_progress(clusterings, results, elapsed: float, num_running: int):
+    totals = []
+    for (_, clusters), clustering_results in zip(clusterings, results):
+        if all(distance < float('inf') for _, distance in clustering_results):
+            totals.append(f"{len(clusters)}: {sum(distance for _, distance in clustering_results):.1f}m")
+    num_routes = instrument.counters["routes_built"] + instrument.counters["ruin_recreate_iterations"]
+    instrument.progress(f"{elapsed:.1f}s, {num_running} slice(s) running, {num_routes} routes, best {' | '.join(totals)}")
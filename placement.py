@@ -0,0 +1,190 @@
+import time
+import numpy as np
+from coordinate import Coordinate
+from pointset import PointSet
+from solution import Solution, create_solution
+from spatial import ClusterDistances
+from local_search import improve_route
+from tour import closed_route_length, RouteCosts
+from utils import coordinates_to_array
+
+# Landing pad placement after route search.
+# k-means centers minimize squared distance to the points, not route length. Only the pad-to-first and
+# last-to-pad legs depend on where the pad is, and by the triangle inequality they are shortest (exactly the
+# first-to-last distance) anywhere on the segment between the route's first and last points. So each pad moves
+# onto its route's cycle, at the point of the nearest cycle edge closest to where it was. Points near a
+# cluster boundary can also move to the neighboring route when that shortens the total route length.
+
+# point of segment a-b closest to 'point'
+def _project_onto_segment(point: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    ab = b - a
+    length_squared = float(ab @ ab)
+    if length_squared == 0:
+        return a.copy()
+    t = min(max(float((point - a) @ ab) / length_squared, 0.0), 1.0)
+    return a + t * ab
+
+# Moves 'pad' onto the closest edge of the route's cycle and rotates the route to start and end on that edge.
+# Returns the new pad and route, the closed length becomes the length of the cycle through the route's points.
+def place_pad(points: np.ndarray, pad: np.ndarray, route: list[int]) -> tuple[np.ndarray, list[int]]:
+    if len(route) == 0:
+        return pad, route
+    cycle = points[route]
+    following = np.roll(cycle, -1, axis=0)
+    # squared distance from the pad to every cycle edge (i, i+1), the last edge closes the cycle
+    edges = following - cycle
+    lengths_squared = np.maximum(np.einsum("nd,nd->n", edges, edges), 1e-300)
+    t = np.clip(np.einsum("nd,nd->n", pad - cycle, edges) / lengths_squared, 0.0, 1.0)
+    closest = cycle + t[:, np.newaxis] * edges
+    edge_idx = int(np.argmin(np.square(closest - pad).sum(axis=1)))
+    new_pad = _project_onto_segment(pad, cycle[edge_idx], following[edge_idx])
+    # the route now leaves the pad towards edge_idx+1 and comes back from edge_idx
+    start = (edge_idx + 1) % len(route)
+    return new_pad, route[start:] + route[:start]
+
+# Moves boundary points to the neighboring route where they cost less than they save, returns the number moved.
+# A point is on the boundary when it is at most (1 + margin) times further from another route's centroid than
+# from its own. 'routes' are changed in place, no route is emptied and none grows past 'capacity' points.
+def reassign_boundary_points(points: np.ndarray, pads: np.ndarray, routes: list[list[int]], margin: float = 0.25, capacity: int = None) -> int:
+    if len(routes) < 2:
+        return 0
+    centroids = np.array([points[route].mean(axis=0) for route in routes])
+    candidates = []
+    for cluster_idx, route in enumerate(routes):
+        to_centroids = np.hypot(*(points[route][:, np.newaxis, :] - centroids[np.newaxis, :, :]).transpose(2, 0, 1))
+        own = to_centroids[:, cluster_idx].copy()
+        to_centroids[:, cluster_idx] = np.inf
+        for position in np.flatnonzero(to_centroids.min(axis=1) <= (1 + margin) * own):
+            candidates.append((route[position], cluster_idx, np.flatnonzero(to_centroids[position] <= (1 + margin) * own[position]).tolist()))
+
+    # route legs are kept between candidates and only rebuilt for the two routes a move changes
+    costs = [RouteCosts(points, pad, route) for pad, route in zip(pads, routes)]
+    moved = 0
+    for point_idx, cluster_idx, neighbor_clusters in candidates:
+        route = routes[cluster_idx]
+        if len(route) <= 1:
+            continue
+        position = route.index(point_idx)
+        gain = float(costs[cluster_idx].removal_gain(position))
+        best = None
+        for other_idx in neighbor_clusters:
+            if capacity is not None and len(routes[other_idx]) >= capacity:
+                continue
+            insert_position, cost = costs[other_idx].cheapest_insertion(points[point_idx])
+            if cost < gain - 1e-9 and (best is None or cost < best[2]):
+                best = (other_idx, insert_position, cost)
+        if best is not None:
+            other_idx, insert_position, _ = best
+            route.pop(position)
+            routes[other_idx].insert(insert_position, point_idx)
+            costs[cluster_idx] = RouteCosts(points, pads[cluster_idx], route)
+            costs[other_idx] = RouteCosts(points, pads[other_idx], routes[other_idx])
+            moved += 1
+    return moved
+
+# Solution for the optimized pads and routes
+def _build_solution(points: np.ndarray, pads: np.ndarray, routes: list[list[int]], old_pads: list[Coordinate]) -> Solution:
+    # pads are rounded like every Coordinate, a pad that would land on another one stays where it was
+    landing_pads = []
+    for pad, old_pad in zip(pads, old_pads):
+        landing_pad = Coordinate(float(pad[0]), float(pad[1]))
+        landing_pads.append(old_pad if landing_pad in landing_pads else landing_pad)
+    clusters = {cluster_idx: sorted(route) for cluster_idx, route in enumerate(routes)}
+    results = [(route, closed_route_length(points, np.array(pad.loc), route)) for pad, route in zip(landing_pads, routes)]
+    # Solution's own checks (duplicate pads, every location served once) still apply
+    return create_solution(len(points), landing_pads, clusters, results)
+
+# Returns 'solution' with its landing pads moved onto their routes and boundary points reassigned, or 'solution'
+# itself when that does not make the total route shorter.
+# NOTE: local search after every round is shared by clusters by size within 'time_budget' seconds
+# NOTE: 'capacity' is the most points a route may hold after reassignment, as set by balanced clustering
+def optimize_landing_pads(solution: Solution, coordinates: PointSet, time_budget: float = 1.0, rounds: int = 3, capacity: int = None) -> Solution:
+    points = coordinates_to_array(coordinates)
+    pads = np.array([pad.loc for pad in solution.landing_pads], dtype=np.float64)
+    routes = [list(route) for route in solution.drone_routes]
+    deadline = time.time() + time_budget
+
+    for round_idx in range(rounds):
+        moved = reassign_boundary_points(points, pads, routes, capacity=capacity)
+        points_left = len(points)
+        for cluster_idx, route in enumerate(routes):
+            # polish around the current pad first, the pad then moves onto the polished route
+            distances = ClusterDistances(points, route, pads[cluster_idx][0], pads[cluster_idx][1])
+            # each route's share of the time still left is taken among the points not yet polished this round
+            cluster_deadline = time.time() + max(deadline - time.time(), 0) * len(route) / max(points_left, 1)
+            points_left -= len(route)
+            route, _ = improve_route(distances, route, cluster_deadline)
+            pads[cluster_idx], routes[cluster_idx] = place_pad(points, pads[cluster_idx], route)
+        if (round_idx > 0 and moved == 0) or time.time() >= deadline:
+            break
+
+    optimized = _build_solution(points, pads, routes, solution.landing_pads)
+    if optimized.total_route_len >= solution.total_route_len:
+        return solution
+    return optimized
+
+# Min-max rebalancing: moves points off the longest route while that lowers the longest route length.
+# A move is taken when neither the shortened route nor the receiving route ends up as long as the old maximum,
+# the candidates are the longest route's points within (1 + margin) of another route's centroid.
+# 'routes' are changed in place and none grows past 'capacity' points, returns the number of points moved.
+def rebalance_makespan(points: np.ndarray, pads: np.ndarray, routes: list[list[int]], deadline: float, margin: float = 0.5, capacity: int = None) -> int:
+    if len(routes) < 2:
+        return 0
+    costs = [RouteCosts(points, pad, route) for pad, route in zip(pads, routes)]
+    moved = 0
+    while time.time() < deadline:
+        lengths = [cost.length for cost in costs]
+        longest = int(np.argmax(lengths))
+        route = routes[longest]
+        if len(route) <= 1:
+            break
+        centroids = np.array([points[other].mean(axis=0) for other in routes])
+        to_centroids = np.hypot(*(points[route][:, np.newaxis, :] - centroids[np.newaxis, :, :]).transpose(2, 0, 1))
+        own = to_centroids[:, longest].copy()
+        to_centroids[:, longest] = np.inf
+
+        best = None
+        positions = np.flatnonzero(to_centroids.min(axis=1) <= (1 + margin) * own)
+        # every candidate's removal gain in one go
+        gains = costs[longest].removal_gain(positions)
+        for position, gain in zip(positions.tolist(), gains.tolist()):
+            for other_idx in np.flatnonzero(to_centroids[position] <= (1 + margin) * own[position]).tolist():
+                if capacity is not None and len(routes[other_idx]) >= capacity:
+                    continue
+                insert_position, cost = costs[other_idx].cheapest_insertion(points[route[position]])
+                new_makespan = max(lengths[longest] - gain, lengths[other_idx] + cost)
+                if new_makespan < lengths[longest] - 1e-9 and (best is None or new_makespan < best[0]):
+                    best = (new_makespan, position, other_idx, insert_position)
+        if best is None:
+            break
+        _, position, other_idx, insert_position = best
+        routes[other_idx].insert(insert_position, route.pop(position))
+        costs[longest] = RouteCosts(points, pads[longest], route)
+        costs[other_idx] = RouteCosts(points, pads[other_idx], routes[other_idx])
+        moved += 1
+    return moved
+
+# Returns 'solution' with points moved off its longest route, polished routes and pads moved onto them,
+# or 'solution' itself when that does not lower the makespan
+# NOTE: no route gets longer from pad placement, so unlike optimize_landing_pads no boundary points move by total length
+def optimize_makespan(solution: Solution, coordinates: PointSet, time_budget: float = 1.0, capacity: int = None) -> Solution:
+    points = coordinates_to_array(coordinates)
+    pads = np.array([pad.loc for pad in solution.landing_pads], dtype=np.float64)
+    routes = [list(route) for route in solution.drone_routes]
+    deadline = time.time() + time_budget
+
+    # half the budget moves points, the rest polishes the routes they changed
+    rebalance_makespan(points, pads, routes, time.time() + time_budget / 2, capacity=capacity)
+    points_left = len(points)
+    for cluster_idx, route in enumerate(routes):
+        distances = ClusterDistances(points, route, pads[cluster_idx][0], pads[cluster_idx][1])
+        # each route's share of the time still left is taken among the points not yet polished
+        cluster_deadline = time.time() + max(deadline - time.time(), 0) * len(route) / max(points_left, 1)
+        points_left -= len(route)
+        route, _ = improve_route(distances, route, cluster_deadline)
+        pads[cluster_idx], routes[cluster_idx] = place_pad(points, pads[cluster_idx], route)
+
+    optimized = _build_solution(points, pads, routes, solution.landing_pads)
+    if optimized.makespan >= solution.makespan:
+        return solution
+    return optimized
@@ -0,0 +1,162 @@
+import numpy as np
+from matplotlib.figure import Figure
+from coordinate import Coordinate
+from pointset import PointSet
+from utils import parse_input, convert_solution_list, coordinates_to_array
+
+# All matplotlib code lives here so solving never pays the matplotlib import: solution.py and test.py
+# import this module only when a figure is actually drawn.
+# PNG exports draw on a bare Figure, which renders through the headless Agg canvas without pyplot,
+# while the interactive helpers below load pyplot on first use to open windows.
+
+# returns matplotlib.pyplot, imported on first use
+def get_pyplot():
+    import matplotlib.pyplot as plot
+    return plot
+
+ROUTE_COLORS = ["red", "green", "blue", "orange"]
+LANDING_PAD_COLORS = ["green", "red", "orange", "blue"] # for contrast
+
+# keeps at most 'max_points' evenly spaced vertices of a closed path (both pad ends always stay), for previews
+def decimate_path(path: np.ndarray, max_points: int = None) -> np.ndarray:
+    if max_points is None or len(path) <= max_points:
+        return path
+    keep = np.unique(np.linspace(0, len(path) - 1, max(max_points, 2)).round().astype(np.intp))
+    return path[keep]
+
+# Draws every route as one LineCollection and every landing pad with one scatter call
+def draw_solution(axes, solution, points: np.ndarray, max_path_points: int = None):
+    from matplotlib.collections import LineCollection
+    pads = np.array([pad.loc for pad in solution.landing_pads], dtype=np.float64)
+    paths = []
+    for i, route in enumerate(solution.drone_routes):
+        # closed path: landing pad -> route -> landing pad
+        path = np.vstack((pads[i], points[route], pads[i]))
+        paths.append(decimate_path(path, max_path_points))
+    axes.add_collection(LineCollection(paths, colors=ROUTE_COLORS[:len(paths)], linewidths=0.8))
+    axes.scatter(pads[:, 0], pads[:, 1], c=LANDING_PAD_COLORS[:len(pads)], marker="o", zorder=3)
+    axes.autoscale_view()
+    axes.set_aspect("equal", adjustable="datalim")
+    axes.set_axis_off()
+
+# saves and then clears 'figure' so nothing is kept alive between exports. Returns true if successful
+def _save_figure(figure: Figure, file_name: str) -> bool:
+    try:
+        figure.savefig(file_name)
+    except FileNotFoundError:
+        return False
+    finally:
+        figure.clear()
+    return True
+
+# Renders a Solution's routes and landing pads to a 1920 x 1920 PNG. Returns true if successful
+# NOTE: 'max_path_points' decimates every route to that many vertices for a quick preview
+def render_solution_png(solution, file_name:str, coordinates:PointSet, title:str, max_path_points:int = None) -> bool:
+    # 1950 x 1950 minimum
+    dpi = 250
+    min_w_pixels = 1920
+    min_h_pixels = 1920
+    figsize_w = min_w_pixels / dpi
+    figsize_h = min_h_pixels / dpi
+
+    # sets min dimensions as per instructions
+    # a bare Figure renders headless through Agg and is never registered with pyplot, so it cannot leak
+    figure = Figure(figsize=(figsize_w, figsize_h), dpi=dpi)
+    axes = figure.add_subplot()
+    draw_solution(axes, solution, coordinates_to_array(coordinates), max_path_points)
+    axes.set_title(title)
+    return _save_figure(figure, file_name)
+
+# Renders every Solution (e.g. the 1 to 4 drone candidates) side by side in one multi-panel PNG. Returns true if successful
+def render_solutions_png(solutions, file_name:str, coordinates:PointSet, title:str, max_path_points:int = None) -> bool:
+    dpi = 250
+    num_columns = min(len(solutions), 2)
+    num_rows = (len(solutions) + num_columns - 1) // num_columns
+    # every panel gets the same 1920 x 1920 pixels as a single export
+    figure = Figure(figsize=(1920 * num_columns / dpi, 1920 * num_rows / dpi), dpi=dpi)
+    points = coordinates_to_array(coordinates)
+    for i, solution in enumerate(solutions):
+        axes = figure.add_subplot(num_rows, num_columns, i + 1)
+        draw_solution(axes, solution, points, max_path_points)
+        axes.set_title(f"{solution.num_drones} drone(s): {solution.total_route_len:.1f} meters, longest {solution.makespan:.1f} meters")
+    figure.suptitle(title)
+    return _save_figure(figure, file_name)
+
+# takes list of file_names and creates a unified "overall solution jpeg". Returns true if successful
+def generate_overall_graph(file_names:list[str], input_name) -> bool:
+    plot = get_pyplot()
+    num_drones = len(file_names)
+    
+    drone_routes = []
+
+    plot_color_dict = ["pink", "green", "blue", "yellow"]
+
+    for index in num_drones:
+        file_name = file_names[index]
+        coordinates = parse_input(file_name)
+        solution_coordinates = convert_solution_list(file_name)
+
+        x_coordinates, y_coordinates = get_plot_route(solution_coordinates)
+        plot.plot(x_coordinates, y_coordinates, color=f"{plot_color_dict[index]}", marker=f"Drone #{index+1}",)
+            
+    plot.title(input_name[:-4] + " Visualization")
+    plot.savefig(f"{input_name}_OVERALL_SOLUTION.jpeg")
+
+    return False
+
+
+def get_plot_route(route: list[int], coordinates: list[Coordinate]) -> tuple[list[int], list[int]]:
+    # need to isolate the x and y coordinates for matplot
+    x_coordinates = []
+    y_coordinates = []
+    for coord_idx in route:
+        x_coordinates.append(coordinates[coord_idx-1].get_x())
+        y_coordinates.append(coordinates[coord_idx-1].get_y())
+    return tuple[x_coordinates, y_coordinates]
+
+
+def plot_circles(centers: list[Coordinate], x_coordinates: list[list[float]], y_coordinates: list[list[float]], radii: int, colors: list[str] = None):
+    # Plot for confirmation + report figures
+    plot = get_pyplot()
+    plot.figure()
+    for idx, center in enumerate(centers):
+        x_center = center.get_x()
+        y_center = center.get_y()
+        circle_angles = np.linspace(0, 2*np.pi, 720)
+        circle_x = radii * np.cos(circle_angles) + x_center
+        circle_y = radii * np.sin(circle_angles) + y_center
+        if colors:
+            plot.scatter(x_coordinates[idx], y_coordinates[idx], color=colors[idx])
+        else:
+            plot.scatter(x_coordinates[idx], y_coordinates[idx], color='black')
+            plot.plot(circle_x, circle_y, 'b-')
+            plot.plot(x_center, y_center, 'gx')
+    plot.axis('equal')
+    plot.xlabel("X")
+    plot.ylabel("Y")
+    plot.show()
+
+def plot_clusters(clusters: list[int], coordinates: list[Coordinate]):
+    if len(clusters) < 4: return
+    plot = get_pyplot()
+    colors = ["red", "green", "blue", "orange"]
+    points = coordinates_to_array(coordinates)
+    for idx in range(len(clusters)):
+        x_coords = points[clusters[idx], 0]
+        y_coords = points[clusters[idx], 1]
+        plot.plot(x_coords, y_coords, color=colors[idx], marker="None")
+    
+    # 1950 x 1950 minimum
+    dpi = 200
+    min_w_pixels = 1920
+    min_h_pixels = 1920
+    figsize_w = min_w_pixels / dpi
+    figsize_h = min_h_pixels / dpi
+
+    # sets min dimensions as per instructions
+    plot.figure(figsize=(figsize_w, figsize_h), dpi=dpi)
+
+    # hide axes
+    plot.subplot().set_axis_off()
+
+    plot.show()
@@ -0,0 +1,42 @@
+import numpy as np
+from collections.abc import Sequence
+from coordinate import Coordinate
+
+# Compact point store backed by one contiguous (N, 2) float64 array (16 bytes per point).
+# Behaves like the list[Coordinate] it replaces: len(), indexing and iteration hand out Coordinate
+# views created on demand, while hot loops read 'array' or the zero-copy 'x' / 'y' columns directly.
+class PointSet(Sequence):
+
+    def __init__(self, points: np.ndarray):
+        self.array = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+
+    @classmethod
+    def from_coordinates(cls, coordinates: list[Coordinate]):
+        return cls(np.array([coordinate.loc for coordinate in coordinates], dtype=np.float64))
+
+    # zero-copy view of the x column
+    @property
+    def x(self) -> np.ndarray:
+        return self.array[:, 0]
+
+    # zero-copy view of the y column
+    @property
+    def y(self) -> np.ndarray:
+        return self.array[:, 1]
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    # an int gives a Coordinate view, a slice or index list gives a PointSet
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            x, y = self.array[idx]
+            return Coordinate(float(x), float(y))
+        return PointSet(self.array[idx])
+
+    def __iter__(self):
+        for x, y in self.array.tolist():
+            yield Coordinate(x, y)
+
+    def to_coordinates(self) -> list[Coordinate]:
+        return list(self)
@@ -0,0 +1,92 @@
+import random
+import time
+import numpy as np
+import instrument
+from coordinate import Coordinate
+from utils import make_rng, make_scalar_rng
+from spatial import ClusterDistances, draw_skips
+from local_search import improve_route, RouteImprover
+from ruin_recreate import RuinAndRecreate
+from exact import can_solve_exactly, solve_exact
+
+# Index-backed versions of main._find_route and the per-cluster search loop used by main.find_routes
+
+# how a cluster's search time is spent:
+#   restarts   independent randomized nearest neighbor routes, the best one polished with local search
+#   ruin       one polished route improved by ruin and recreate for the whole budget (ruin_recreate.py)
+ROUTE_ENGINES = ("ruin", "restarts")
+
+# Same augmented nearest neighbor route as _find_route, reading every distance from the cluster's precomputation
+def _find_route_precomputed(distances: ClusterDistances, chance, rng: random.Random = None):
+    if instrument.enabled:
+        instrument.count("routes_built")
+    if distances.size == 0:
+        return [], 0.0
+    distances.begin_route()
+    # Landing pad to first point in route, the pad distances are already sorted
+    skips = draw_skips(chance, rng)
+    first = distances.pad_order[skips] if skips < distances.size else distances.pad_order[0]
+    route = [first]
+    distances.visit(first)
+    while len(route) < distances.size:
+        nn, _ = distances.nearest_unvisited(route[-1], draw_skips(chance, rng))
+        route.append(nn)
+        distances.visit(nn)
+    if instrument.enabled:
+        instrument.count("nearest_queries", len(route))
+    # Total distance includes the pad-to-first and last-to-pad legs
+    distance = distances.route_length(route)
+    # Return the indexes of the coordinates in the route, and the total distance of the route
+    return distances.indexes[route].tolist(), distance
+
+# Best route for one cluster within 'duration' seconds
+# NOTE: clusters small enough for exact_solve return their optimal route at once without using 'duration'
+# NOTE: 'improve_share' is the fraction of 'duration' reserved for 2-opt / Or-opt on the best route
+# NOTE: 'incumbent' is an optional earlier route for this exact cluster that the search starts from
+# NOTE: 'rng' is a numpy Generator (or seed) for the skip draws, 'max_routes' stops sampling after that many routes
+# instead of at the time limit so a seeded search does not depend on machine speed
+# NOTE: 'engine' is one of ROUTE_ENGINES, with "ruin" 'improve_share' is ignored and 'max_routes' counts iterations
+# NOTE: 'distances' is an optional ClusterDistances of this cluster kept from an earlier call
+def find_cluster_route(points: np.ndarray, center: Coordinate, cluster_coords: list[int], duration, chance, improve_share=0.25, incumbent: list[int] = None, rng: np.random.Generator = None, max_routes: int = None, engine: str = "ruin", distances: ClusterDistances = None):
+    start_time = time.time()
+    scalar_rng = make_scalar_rng(make_rng(rng))
+    num_routes = 0
+    route_bsf = None
+    distance_bsf = float('inf')
+    # computed once per cluster and reused by every randomized route
+    if distances is None:
+        distances = ClusterDistances(points, cluster_coords, center.get_x(), center.get_y())
+    if can_solve_exactly(distances.size):
+        return solve_exact(distances)
+    deadline = start_time + duration if duration is not None else float('inf')
+    if engine == "ruin":
+        local_route = distances.to_local(incumbent) if incumbent is not None else start_route(distances, chance, scalar_rng, deadline)
+        search = RuinAndRecreate(distances, local_route, scalar_rng)
+        local_route, distance_bsf = search.run(deadline, max_routes)
+        return distances.indexes[local_route].tolist(), distance_bsf
+    if incumbent is not None:
+        route_bsf = incumbent
+        distance_bsf = distances.route_length(distances.to_local(incumbent))
+    # search for better solutions w/ augmented nearest neighbor for the rest of 'duration' seconds
+    while route_bsf is None or (num_routes < max_routes if max_routes is not None else time.time() < start_time + duration * (1 - improve_share)):
+        route, distance = _find_route_precomputed(distances, chance, scalar_rng)
+        num_routes += 1
+        # Keep the route with the shortest distance
+        if distance < distance_bsf:
+            distance_bsf = distance
+            route_bsf = route
+            if instrument.enabled:
+                instrument.count("best_route_improvements")
+    # Improve the best route with local search until no move helps or the cluster's time is up
+    if improve_share > 0:
+        route_bsf, distance_bsf = improve_route(distances, route_bsf, deadline)
+    return route_bsf, distance_bsf
+
+# Starting tour for ruin and recreate: one randomized nearest neighbor route polished with local search, as local indexes
+def start_route(distances: ClusterDistances, chance, rng: random.Random, deadline: float) -> list[int]:
+    route, _ = _find_route_precomputed(distances, chance, rng)
+    local_route = distances.to_local(route)
+    if distances.size < 3:
+        return local_route
+    local_route, _ = RouteImprover(distances, local_route).run(deadline)
+    return local_route
@@ -0,0 +1,144 @@
+import math
+import random
+import time
+import instrument
+from spatial import ClusterDistances
+from local_search import RouteImprover
+
+# Ruin-and-recreate search for one cluster's closed route.
+# Instead of resampling routes from scratch it keeps working on a good tour: every iteration removes a few short
+# strings of consecutive points around a random spot, reinserts the removed points one by one where they
+# lengthen the tour the least (next to one of their candidate neighbors), and polishes only the touched part
+# with 2-opt / Or-opt. The new tour replaces the current one when it is no longer than the current one plus a
+# threshold that shrinks as the iterations go on, so the search can cross small hills towards shorter tours.
+# NOTE: everything inside works on local indexes like ClusterDistances, the landing pad is local index n
+
+class RuinAndRecreate:
+
+    # NOTE: 'route' is the local route to start from, ideally already polished by local search
+    # NOTE: 'max_strings' and 'max_string_len' bound how much of the tour one iteration removes
+    def __init__(self, distances: ClusterDistances, route: list[int], rng: random.Random = None, max_strings: int = 8, max_string_len: int = 40, threshold: float = 0.02):
+        self.distances = distances
+        self.size = distances.size
+        self.pad = distances.size
+        self.rng = rng or random
+        self.xs = distances.points[:, 0].tolist()
+        self.ys = distances.points[:, 1].tolist()
+        self.pad_distances = distances.pad_distances.tolist()
+        self.max_strings = max_strings
+        self.max_string_len = max(1, min(max_string_len, self.size // 10))
+        self.route = list(route)
+        self.length = distances.route_length(self.route)
+        self.best_route = self.route
+        self.best_length = self.length
+        # the acceptance threshold starts at 'threshold' times an average leg and cools down with every iteration
+        self.start_threshold = threshold * self.length / max(self.size, 1)
+        self.iterations = 0
+
+    def dist(self, a: int, b: int) -> float:
+        if a == self.pad:
+            return self.pad_distances[b]
+        if b == self.pad:
+            return self.pad_distances[a]
+        return math.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b])
+
+    # Removes strings of consecutive points around a random point and its nearest neighbors from the linked tour.
+    # Returns the removed points and the points left next to the gaps.
+    # NOTE: at least one point always stays, recreate needs a tour edge besides pad-to-pad to insert into
+    def ruin(self, succ: list[int], pred: list[int]) -> tuple[list[int], list[int]]:
+        rng = self.rng
+        seed = rng.randrange(self.size)
+        centers = [seed] + self.distances.candidates[seed][:self.max_strings - 1]
+        removed = []
+        in_tour = [True] * (self.size + 1)
+        for center in centers[:rng.randint(1, len(centers))]:
+            if not in_tour[center]:
+                continue
+            # a string of up to max_string_len points that contains 'center'
+            string_len = rng.randint(1, self.max_string_len)
+            first = center
+            for _ in range(rng.randrange(string_len)):
+                if pred[first] == self.pad or not in_tour[pred[first]]:
+                    break
+                first = pred[first]
+            node = first
+            for _ in range(string_len):
+                if node == self.pad or not in_tour[node] or len(removed) >= self.size - 1:
+                    break
+                following = succ[node]
+                succ[pred[node]] = following
+                pred[following] = pred[node]
+                in_tour[node] = False
+                removed.append(node)
+                node = following
+        neighbors = [node for node in set(pred[node] for node in removed) | set(succ[node] for node in removed) if in_tour[node] and node != self.pad]
+        return removed, neighbors
+
+    # Reinserts every removed point into the linked tour at the cheapest edge next to one of its candidate
+    # neighbors, the two pad edges are always candidates so every point has a place to go
+    def recreate(self, succ: list[int], pred: list[int], removed: list[int]):
+        in_tour = [True] * (self.size + 1)
+        for node in removed:
+            in_tour[node] = False
+        self.rng.shuffle(removed)
+        for node in removed:
+            best_cost = float('inf')
+            best_edge = None
+            edges = [(self.pad, succ[self.pad]), (pred[self.pad], self.pad)]
+            for neighbor in self.distances.candidates[node]:
+                if in_tour[neighbor]:
+                    edges.append((pred[neighbor], neighbor))
+                    edges.append((neighbor, succ[neighbor]))
+            for u, v in edges:
+                cost = self.dist(u, node) + self.dist(node, v) - self.dist(u, v)
+                if cost < best_cost:
+                    best_cost = cost
+                    best_edge = (u, v)
+            u, v = best_edge
+            succ[u] = node
+            pred[node] = u
+            succ[node] = v
+            pred[v] = node
+            in_tour[node] = True
+
+    # Runs iterations until 'deadline' (time.time() seconds) or until 'max_iterations' more have run,
+    # returns the best local route found so far and its closed length
+    def run(self, deadline: float, max_iterations: int = None) -> tuple[list[int], float]:
+        if self.size < 8:
+            return self.best_route, self.best_length
+        iterations = 0
+        while time.time() < deadline and (max_iterations is None or iterations < max_iterations):
+            iterations += 1
+            self.iterations += 1
+            # linked tour of the current route, the pad closes the cycle
+            succ = [0] * (self.size + 1)
+            pred = [0] * (self.size + 1)
+            previous = self.pad
+            for node in self.route:
+                succ[previous] = node
+                pred[node] = previous
+                previous = node
+            succ[previous] = self.pad
+            pred[self.pad] = previous
+
+            removed, neighbors = self.ruin(succ, pred)
+            self.recreate(succ, pred, removed)
+            route = []
+            node = succ[self.pad]
+            while node != self.pad:
+                route.append(node)
+                node = succ[node]
+
+            route, length = RouteImprover(self.distances, route).run(deadline, removed + neighbors)
+            threshold = self.start_threshold / (1 + self.iterations / 100)
+            if length < self.length + threshold:
+                self.route = route
+                self.length = length
+            if length < self.best_length - 1e-9:
+                self.best_route = route
+                self.best_length = length
+                if instrument.enabled:
+                    instrument.count("best_route_improvements")
+        if instrument.enabled:
+            instrument.count("ruin_recreate_iterations", iterations)
+        return self.best_route, self.best_length
@@ -0,0 +1,181 @@
+import time
+import numpy as np
+import instrument
+from coordinate import Coordinate
+from pointset import PointSet
+from solution import Solution, create_solution
+from spatial import ClusterDistances
+from local_search import improve_route
+from routing import _find_route_precomputed, start_route
+from ruin_recreate import RuinAndRecreate
+from exact import can_solve_exactly, solve_exact
+from utils import coordinates_to_array, make_rng, make_scalar_rng, spawn_seeds
+
+# Anytime route search.
+# One overall deadline is shared by every cluster of every drone count. Time is handed out in rounds of slices
+# sized by cluster size and recent improvement rate, clusters that stop improving are retired early, and the
+# best-so-far Solution for each drone count can be read at any moment, or streamed as it improves.
+
+# Resumable search state for one cluster: each step builds randomized nearest neighbor routes
+# and polishes them with local search until the step's deadline, keeping the best
+# (or, with the "ruin" engine, carries on ruin and recreate from where the last step stopped)
+class ClusterSearch:
+
+    # NOTE: 'incumbent' is an optional earlier route for this exact cluster to start from
+    # NOTE: 'rng' is a numpy Generator (or seed) for this cluster's skip draws
+    # NOTE: 'name' labels this cluster's time in the instrumentation report
+    # NOTE: 'engine' is one of routing.ROUTE_ENGINES
+    def __init__(self, points: np.ndarray, center: Coordinate, cluster_coords: list[int], chance, patience: int = 3, incumbent: list[int] = None, rng: np.random.Generator = None, name: str = "cluster", engine: str = "ruin"):
+        self.name = name
+        self.engine = engine
+        self.search = None
+        self.rng = make_scalar_rng(make_rng(rng))
+        self.distances = ClusterDistances(points, cluster_coords, center.get_x(), center.get_y())
+        self.size = len(cluster_coords)
+        self.chance = chance
+        self.patience = patience
+        self.route_bsf = None
+        self.distance_bsf = float('inf')
+        if incumbent is not None:
+            self.route_bsf = incumbent
+            self.distance_bsf = self.distances.route_length(self.distances.to_local(incumbent))
+        self.time_spent = 0.0
+        self.rate = float('inf') # route length gained per second over the last step, unknown until the first step
+        self.stale_steps = 0
+        # small clusters get their optimal route up front and never take a slice
+        self.exact = can_solve_exactly(self.size)
+        if self.exact:
+            self.route_bsf, self.distance_bsf = solve_exact(self.distances)
+
+    # exactly solved clusters are done, others retire after 'patience' steps without improvement
+    def plateaued(self) -> bool:
+        if self.route_bsf is None:
+            return False
+        return self.exact or self.stale_steps >= self.patience
+
+    # NOTE: always completes at least one route, so every cluster has a result after its first step
+    def step(self, deadline: float):
+        start_time = time.time()
+        distance_before = self.distance_bsf
+        if self.engine == "ruin":
+            # the first step starts from the incumbent or a polished nearest neighbor route, later ones carry on
+            if self.search is None:
+                local_route = self.distances.to_local(self.route_bsf) if self.route_bsf is not None else start_route(self.distances, self.chance, self.rng, deadline)
+                self.search = RuinAndRecreate(self.distances, local_route, self.rng)
+            local_route, distance = self.search.run(deadline)
+            if distance < self.distance_bsf:
+                self.distance_bsf = distance
+                self.route_bsf = self.distances.indexes[local_route].tolist()
+        else:
+            while True:
+                route, distance = _find_route_precomputed(self.distances, self.chance, self.rng)
+                route, distance = improve_route(self.distances, route, deadline)
+                # Keep the route with the shortest distance
+                if distance < self.distance_bsf:
+                    self.distance_bsf = distance
+                    self.route_bsf = route
+                    if instrument.enabled:
+                        instrument.count("best_route_improvements")
+                if time.time() >= deadline:
+                    break
+        elapsed = max(time.time() - start_time, 1e-9)
+        self.time_spent += elapsed
+        if instrument.enabled:
+            instrument.add_time(f"route search/{self.name}", elapsed)
+
+        gain = distance_before - self.distance_bsf if self.route_bsf is not None and distance_before != float('inf') else 0.0
+        if distance_before == float('inf') or gain > 1e-9 * self.distance_bsf:
+            self.stale_steps = 0
+        else:
+            self.stale_steps += 1
+        self.rate = gain / elapsed
+
+class AnytimeScheduler:
+
+    # 'incumbents' optionally holds earlier routes (one list per clustering, or None) to start from
+    # 'seed' is split into one independent stream per cluster, 'engine' is one of routing.ROUTE_ENGINES
+    def __init__(self, clusterings: list[tuple[list[Coordinate], dict[int, list[int]]]], coordinates: PointSet, chance, round_length: float = 1.0, patience: int = 3, incumbents: list[list[list[int]]] = None, seed=None, engine: str = "ruin"):
+        points = coordinates_to_array(coordinates)
+        self.num_locations = len(coordinates)
+        self.clusterings = clusterings
+        # round_length is the seconds each active cluster gets per round on average
+        self.round_length = round_length
+        incumbents = incumbents or [None] * len(clusterings)
+        seeds = iter(spawn_seeds(seed, sum(len(clusters) for _, clusters in clusterings)))
+        self.searches = [[ClusterSearch(points, centers[cluster_idx], cluster_coords, chance, patience, routes[cluster_idx] if routes else None, next(seeds), f"{len(clusters)} drones/cluster {cluster_idx+1}", engine) for cluster_idx, cluster_coords in clusters.items()] for (centers, clusters), routes in zip(clusterings, incumbents)]
+
+    def active_searches(self) -> list[ClusterSearch]:
+        return [search for searches in self.searches for search in searches if not search.plateaued()]
+
+    # Runs rounds of slices until 'deadline' (time.time() seconds) or until every cluster has plateaued
+    def run(self, deadline: float) -> list[Solution]:
+        for _ in self.stream(deadline):
+            pass
+        return self.best_solutions()
+
+    # Generator version of run: after every slice yields the Solution of each drone count whose best total route
+    # got shorter, so callers can act on the best-so-far Solutions while the search goes on.
+    # NOTE: stopping the iteration early simply ends the search
+    def stream(self, deadline: float):
+        start_time = time.time()
+        best_totals = [float('inf')] * len(self.clusterings)
+        # exactly solved and incumbent clusters can complete a drone count before the first slice
+        yield from self._improved_solutions(best_totals)
+        while True:
+            active = self.active_searches()
+            if time.time() >= deadline:
+                # past the deadline only clusters without a route take their one step, so every drone count gets a Solution
+                active = [search for search in active if search.route_bsf is None]
+            if len(active) == 0:
+                break
+            for _ in self.round_slices(active, deadline):
+                yield from self._improved_solutions(best_totals)
+            if instrument.live:
+                self.show_progress(time.time() - start_time, len(active))
+
+    # Solutions of the drone counts whose total route is now shorter than in 'best_totals', which is updated
+    def _improved_solutions(self, best_totals: list[float]):
+        for clustering_idx, searches in enumerate(self.searches):
+            if any(search.route_bsf is None for search in searches):
+                continue
+            total = sum(search.distance_bsf for search in searches)
+            if total < best_totals[clustering_idx]:
+                best_totals[clustering_idx] = total
+                yield self.best_solution(clustering_idx)
+
+    # one status line: elapsed time, clusters still searching, routes built (ruin and recreate iterations included)
+    # and the best total route per drone count
+    def show_progress(self, elapsed: float, num_active: int):
+        totals = []
+        for (_, clusters), searches in zip(self.clusterings, self.searches):
+            if all(search.route_bsf is not None for search in searches):
+                totals.append(f"{len(clusters)}: {sum(search.distance_bsf for search in searches):.1f}m")
+        instrument.progress(f"{elapsed:.1f}s, {num_active} cluster(s) searching, {instrument.counters['routes_built'] + instrument.counters['ruin_recreate_iterations']} routes, best {' | '.join(totals)}")
+
+    # one round as a generator that pauses after every slice
+    def round_slices(self, active: list[ClusterSearch], deadline: float):
+        round_time = min(deadline - time.time(), self.round_length * len(active))
+        # slice weight: cluster size, boosted by how fast the cluster improved relative to the others
+        known_rates = [search.rate for search in active if search.rate != float('inf')]
+        mean_rate = max(np.mean(known_rates), 1e-12) if known_rates else 1.0
+        weights = [search.size * (1 + (search.rate / mean_rate if search.rate != float('inf') else 1)) for search in active]
+        total_weight = sum(weights)
+        # clusters without a route go first so every drone count has a Solution as early as possible
+        for search, weight in sorted(zip(active, weights), key=lambda item: item[0].route_bsf is not None):
+            slice_end = min(time.time() + round_time * weight / total_weight, deadline)
+            search.step(slice_end)
+            yield search
+
+    # best-so-far Solution of one clustering, or None while any of its clusters has no route yet
+    def best_solution(self, clustering_idx: int) -> Solution:
+        centers, clusters = self.clusterings[clustering_idx]
+        searches = self.searches[clustering_idx]
+        if any(search.route_bsf is None for search in searches):
+            return None
+        results = [(search.route_bsf, search.distance_bsf) for search in searches]
+        return create_solution(self.num_locations, centers, clusters, results)
+
+    # best-so-far Solution for every drone count whose clusters all have a route
+    def best_solutions(self) -> list[Solution]:
+        solutions = [self.best_solution(clustering_idx) for clustering_idx in range(len(self.clusterings))]
+        return [solution for solution in solutions if solution is not None]
@@ -1,7 +1,12 @@
+import zipfile
 from coordinate import Coordinate
 from utils import *
+from tour import closed_route_length
 from os import makedirs as makedir
 
+# what a solution is optimized for: "total" route length of every drone, or "makespan" (the longest single route)
+OBJECTIVES = ("total", "makespan")
+
 # encapsulates the "solutions"
 class Solution:
 
@@ -43,10 +48,30 @@ class Solution:
         self.servings_per_drone = servings_per_drone
         self.drone_routes_len = drone_routes_len
         self.drone_routes = drone_routes
+        # the longest route limits turnaround, all drones fly at the same time
+        self.makespan = max(drone_routes_len)
+
+    # checks every recorded route length against the routes flown over 'points' (an (n, 2) array)
+    def route_lengths_match(self, points:np.ndarray, tolerance:float = 1e-6) -> bool:
+        if any(idx < 0 or idx >= len(points) for route in self.drone_routes for idx in route):
+            print(f"ERROR: Solution visits a location that is not in the input")
+            return False
+        for i, route in enumerate(self.drone_routes):
+            length = closed_route_length(points, np.array(self.landing_pads[i].loc), route)
+            if abs(length - self.drone_routes_len[i]) > tolerance * max(length, 1.0):
+                print(f"ERROR: Route {i+1} is {length:.1f} meters long but recorded as {self.drone_routes_len[i]:.1f}")
+                return False
+        return True
+
+    # value of 'objective' for this solution, lower is better
+    def objective(self, objective: str = "total") -> float:
+        if objective == "makespan":
+            return self.makespan
+        return self.total_route_len
     
     def __str__(self) -> str:
         roman_nums = ["i", "ii", "iii", "iv"]
-        output = f"\tIf you use {self.num_drones} drone(s), the total route will be {self.total_route_len:.1f} meters\n"
+        output = f"\tIf you use {self.num_drones} drone(s), the total route will be {self.total_route_len:.1f} meters (longest route {self.makespan:.1f} meters)\n"
 
         for i in range(self.num_drones):
             output += f"\t{roman_nums[i]}.\tLanding Pad {i+1} "
@@ -68,44 +93,79 @@ class Solution:
         
         return (True, file_names)
     
-    def export_to_png_file(self, directory:str, root_file_name:str, coordinates:list[Coordinate]) -> tuple[bool, str]:
-        route_colors = ["red", "green", "blue", "orange"]
-        landing_pad_colors = ["green", "red", "orange", "blue"] # for contrast
+    # writes every route, landing pad and length into one compressed .npz bundle, see load_solution_bundle
+    def export_to_npz_file(self, directory:str, root_file_name:str) -> tuple[bool, str]:
+        makedir(directory, exist_ok=True)
+        file_name = f"{directory}/{root_file_name}_{self.num_drones}_drones.npz"
+        return (save_solution_bundle(self, file_name), file_name)
+
+    # NOTE: 'max_path_points' decimates every route for a faster, lighter preview
+    def export_to_png_file(self, directory:str, root_file_name:str, coordinates:PointSet, max_path_points:int = None) -> tuple[bool, str]:
+        # matplotlib is only imported once a PNG is actually wanted
+        from plotting import render_solution_png
         makedir(directory, exist_ok=True)
 
         file_name = root_file_name + "_OVERALL_SOLUTION.png"
+        title = file_name[:-4] + " Visualization"
 
-        # 1950 x 1950 minimum
-        dpi = 250
-        min_w_pixels = 1920
-        min_h_pixels = 1920
-        figsize_w = min_w_pixels / dpi
-        figsize_h = min_h_pixels / dpi
+        file_name = directory + "/" + file_name
+        return (render_solution_png(self, file_name, coordinates, title, max_path_points), file_name)
 
-        # sets min dimensions as per instructions
-        plot.figure(figsize=(figsize_w, figsize_h), dpi=dpi)
+# renders every candidate Solution (one per drone count) into one multi-panel PNG
+def export_overview_png(solutions:list[Solution], directory:str, root_file_name:str, coordinates:PointSet, max_path_points:int = None) -> tuple[bool, str]:
+    from plotting import render_solutions_png
+    makedir(directory, exist_ok=True)
 
-        # hide axes
-        plot.subplot().set_axis_off()
-        
-        for i in range(len(self.drone_routes)):
-            x_coordinates = [self.landing_pads[i].get_x()]
-            y_coordinates = [self.landing_pads[i].get_y()]
+    file_name = root_file_name + "_ALL_SOLUTIONS.png"
+    title = file_name[:-4] + " Visualization"
 
-            x_coordinates.extend([coordinates[i].get_x() for i in self.drone_routes[i]])
-            y_coordinates.extend([coordinates[i].get_y() for i in self.drone_routes[i]])
+    file_name = directory + "/" + file_name
+    return (render_solutions_png(solutions, file_name, coordinates, title, max_path_points), file_name)
 
-            x_coordinates.append(self.landing_pads[i].get_x())
-            y_coordinates.append(self.landing_pads[i].get_y())
-            
-            plot.plot(x_coordinates, y_coordinates, color=route_colors[i], marker="None")
-            plot.plot(self.landing_pads[i].get_x(), self.landing_pads[i].get_y(), color=landing_pad_colors[i], marker="o")
-        plot.title(file_name[:-4] + " Visualization")
+# builds a Solution from a clustering and the (route, distance) results find_routes returns for it
+def create_solution(num_locations:int, landing_pads:list[Coordinate], clusters:dict[int, list[int]], results:list[tuple[list[int], float]]) -> Solution:
+    servings_per_drone = [len(val) for val in clusters.values()]
+    drone_routes = [result[0] for result in results]
+    drone_route_len = [result[1] for result in results]
+    total_route_len = sum(drone_route_len)
+    return Solution(len(landing_pads), num_locations, total_route_len, landing_pads, servings_per_drone, drone_route_len, drone_routes)
 
-        file_name = directory + "/" + file_name
-        try:
-            plot.savefig(file_name)
-        except FileNotFoundError:
-            return (False, file_name)
-        
-        return (True, file_name)
+# Single-file binary Solution bundle: the routes (0-based, concatenated, split by 'route_offsets'),
+# landing pads and route lengths, so other tools and re-solves read a Solution without parsing text
+BUNDLE_VERSION = 1
+
+def save_solution_bundle(solution:Solution, file_name:str) -> bool:
+    route_offsets = np.concatenate(([0], np.cumsum([len(route) for route in solution.drone_routes]))).astype(np.int64)
+    routes = np.fromiter((location for route in solution.drone_routes for location in route), dtype=np.int32, count=int(route_offsets[-1]))
+    try:
+        with open(file_name, "wb") as file:
+            np.savez_compressed(file,
+                version=np.int64(BUNDLE_VERSION),
+                num_locations=np.int64(solution.num_locations),
+                routes=routes,
+                route_offsets=route_offsets,
+                landing_pads=np.array([pad.loc for pad in solution.landing_pads], dtype=np.float64),
+                drone_routes_len=np.array(solution.drone_routes_len, dtype=np.float64))
+        return True
+    except OSError:
+        print(f"ERROR: {file_name} could not be opened")
+        return False
+
+# Returns the Solution stored by save_solution_bundle, or None (after printing the error) if it cannot be read
+def load_solution_bundle(file_name:str) -> Solution:
+    try:
+        with np.load(file_name, allow_pickle=False) as bundle:
+            if int(bundle["version"]) != BUNDLE_VERSION:
+                print(f"ERROR: {file_name} has unsupported bundle version {int(bundle['version'])}")
+                return None
+            num_locations = int(bundle["num_locations"])
+            routes = bundle["routes"].astype(np.int64)
+            route_offsets = bundle["route_offsets"]
+            landing_pads = [Coordinate(float(x), float(y)) for x, y in bundle["landing_pads"]]
+            drone_routes_len = bundle["drone_routes_len"].tolist()
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        print(f"ERROR: {file_name} is not a solution bundle")
+        return None
+    drone_routes = [routes[start:end].tolist() for start, end in zip(route_offsets[:-1], route_offsets[1:])]
+    servings_per_drone = [len(route) for route in drone_routes]
+    return Solution(len(landing_pads), num_locations, sum(drone_routes_len), landing_pads, servings_per_drone, drone_routes_len, drone_routes)
@@ -0,0 +1,212 @@
+import math
+import heapq
+import random
+import numpy as np
+from tour import closed_route_length
+
+# Number of improving candidates the augmented nearest neighbor skips before taking one.
+# Each candidate that would improve on the best so far is skipped with probability 'skip_chance'.
+# NOTE: 'rng' is a random.Random, the global random module is used when none is given
+def draw_skips(skip_chance: float, rng: random.Random = None) -> int:
+    rng = rng or random
+    skips = 0
+    while rng.random() < skip_chance:
+        skips += 1
+    return skips
+
+# Uniform grid over a cluster's bounding box for nearest-unvisited queries.
+# Points are bucketed by cell once, visited points are removed as a route is built,
+# and queries search outward ring by ring so each step only touches nearby cells.
+class PointGrid:
+
+    def __init__(self, points: np.ndarray, coordinate_indexes: list[int], points_per_cell: float = 2.0):
+        self.xs = points[:, 0].tolist()
+        self.ys = points[:, 1].tolist()
+        cluster_points = points[coordinate_indexes]
+        self.min_x, self.min_y = cluster_points.min(axis=0) if len(coordinate_indexes) else (0.0, 0.0)
+        max_x, max_y = cluster_points.max(axis=0) if len(coordinate_indexes) else (0.0, 0.0)
+
+        # roughly 'points_per_cell' points in each cell
+        cells_per_side = max(1, int(math.ceil(math.sqrt(len(coordinate_indexes) / points_per_cell))))
+        self.cell_size = max(max_x - self.min_x, max_y - self.min_y, 1e-9) / cells_per_side
+        self.num_cols = int((max_x - self.min_x) / self.cell_size) + 1
+        self.num_rows = int((max_y - self.min_y) / self.cell_size) + 1
+
+        # store the full bucketing so reset() can restore it for the next route
+        self.template = [[] for _ in range(self.num_cols * self.num_rows)]
+        for coord_idx in coordinate_indexes:
+            col, row = self._cell_of(self.xs[coord_idx], self.ys[coord_idx])
+            self.template[row * self.num_cols + col].append(coord_idx)
+        self.reset()
+
+    # refills every cell, undoing all remove() calls
+    def reset(self):
+        self.cells = [set(cell) for cell in self.template]
+        self.remaining = sum(len(cell) for cell in self.template)
+
+    def _cell_of(self, x: float, y: float) -> tuple[int, int]:
+        # clamp so queries from outside the bounding box (e.g. a landing pad) start at the nearest edge cell
+        col = min(max(int((x - self.min_x) / self.cell_size), 0), self.num_cols - 1)
+        row = min(max(int((y - self.min_y) / self.cell_size), 0), self.num_rows - 1)
+        return col, row
+
+    def remove(self, coord_idx: int):
+        col, row = self._cell_of(self.xs[coord_idx], self.ys[coord_idx])
+        self.cells[row * self.num_cols + col].discard(coord_idx)
+        self.remaining -= 1
+
+    # returns up to 'k' (distance, index) pairs of the nearest remaining points, closest first
+    def nearest(self, x: float, y: float, k: int = 1) -> list[tuple[float, int]]:
+        k = min(k, self.remaining)
+        if k <= 0:
+            return []
+        center_col, center_row = self._cell_of(x, y)
+        max_ring = max(center_col, self.num_cols - 1 - center_col, center_row, self.num_rows - 1 - center_row)
+        best = [] # max-heap of (-distance, index) holding the k closest found so far
+        for ring in range(max_ring + 1):
+            for col, row in self._ring_cells(center_col, center_row, ring):
+                for coord_idx in self.cells[row * self.num_cols + col]:
+                    dx = self.xs[coord_idx] - x
+                    dy = self.ys[coord_idx] - y
+                    dist = math.sqrt(dx*dx + dy*dy)
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist, coord_idx))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, coord_idx))
+            # every point in a farther ring is at least 'ring' whole cells away
+            if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                break
+        return sorted((-neg_dist, coord_idx) for neg_dist, coord_idx in best)
+
+    # yields the in-bounds cells on the square ring at Chebyshev distance 'ring' from (col, row)
+    def _ring_cells(self, col: int, row: int, ring: int):
+        if ring == 0:
+            yield col, row
+            return
+        for c in range(max(col - ring, 0), min(col + ring, self.num_cols - 1) + 1):
+            if row - ring >= 0:
+                yield c, row - ring
+            if row + ring < self.num_rows:
+                yield c, row + ring
+        for r in range(max(row - ring + 1, 0), min(row + ring - 1, self.num_rows - 1) + 1):
+            if col - ring >= 0:
+                yield col - ring, r
+            if col + ring < self.num_cols:
+                yield col + ring, r
+
+
+# Per-cluster distance precomputation shared by every randomized route of one cluster.
+# Small clusters get a dense float32 distance matrix, large ones only get K-nearest candidate lists
+# plus a PointGrid fallback, chosen so the matrix never exceeds 'memory_budget' bytes.
+# NOTE: everything inside works on local indexes 0..n-1, 'indexes' maps them back to coordinate indexes
+class ClusterDistances:
+
+    def __init__(self, points: np.ndarray, coordinate_indexes: list[int], center_x: float, center_y: float, memory_budget: int = 32*1024*1024, num_candidates: int = 16):
+        self.indexes = np.asarray(coordinate_indexes, dtype=np.intp)
+        self.points = points[self.indexes]
+        self.size = len(self.indexes)
+        self.matrix = None
+        self.grid = None
+
+        # distances from the landing pad, sorted once so the first leg never needs a search
+        self.pad = np.array([center_x, center_y], dtype=np.float64)
+        self.pad_distances = np.hypot(self.points[:, 0] - center_x, self.points[:, 1] - center_y)
+        self.pad_order = np.argsort(self.pad_distances, kind="stable").tolist()
+
+        self.candidates = [[] for _ in range(self.size)]
+        self.candidate_distances = [[] for _ in range(self.size)]
+        num_candidates = min(num_candidates, self.size - 1)
+        if self.size * self.size * 4 <= memory_budget:
+            self.matrix = np.empty((self.size, self.size), dtype=np.float32)
+        else:
+            self.grid = PointGrid(self.points, list(range(self.size)))
+
+        # compute distances in row blocks so no full float64 matrix is ever materialized
+        rows_per_block = max(1, (8*1024*1024) // (8 * max(self.size, 1)))
+        for row_start in range(0, self.size, rows_per_block):
+            row_end = min(row_start + rows_per_block, self.size)
+            block = self._distance_rows(row_start, row_end)
+            if self.matrix is not None:
+                self.matrix[row_start:row_end] = block
+            if num_candidates > 0:
+                self._add_candidates(row_start, block, num_candidates)
+
+    def _distance_rows(self, row_start: int, row_end: int) -> np.ndarray:
+        diff = self.points[row_start:row_end, np.newaxis, :] - self.points[np.newaxis, :, :]
+        return np.sqrt(np.square(diff).sum(axis=2))
+
+    def _add_candidates(self, row_start: int, block: np.ndarray, num_candidates: int):
+        block = block.copy()
+        # a point is never its own candidate
+        block[np.arange(len(block)), np.arange(row_start, row_start + len(block))] = np.inf
+        nearest = np.argpartition(block, num_candidates - 1, axis=1)[:, :num_candidates]
+        nearest_distances = np.take_along_axis(block, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_distances = np.take_along_axis(nearest_distances, order, axis=1)
+        for offset in range(len(block)):
+            self.candidates[row_start + offset] = nearest[offset].tolist()
+            self.candidate_distances[row_start + offset] = nearest_distances[offset].tolist()
+
+    # maps a route of coordinate indexes back to local indexes
+    def to_local(self, route: list[int]) -> list[int]:
+        if not hasattr(self, "local_of"):
+            self.local_of = {int(coord_idx): i for i, coord_idx in enumerate(self.indexes)}
+        return [self.local_of[coord_idx] for coord_idx in route]
+
+    # distance between two local indexes
+    def distance(self, i: int, j: int) -> float:
+        if self.matrix is not None:
+            return float(self.matrix[i, j])
+        dx = self.points[i, 0] - self.points[j, 0]
+        dy = self.points[i, 1] - self.points[j, 1]
+        return math.sqrt(dx*dx + dy*dy)
+
+    # clears the visited state before building a new route
+    def begin_route(self):
+        self.visited = bytearray(self.size)
+        # NumPy bool view of the same buffer for the dense fallback
+        self.visited_mask = np.frombuffer(self.visited, dtype=np.bool_)
+        if self.grid is not None:
+            self.grid.reset()
+
+    def visit(self, i: int):
+        self.visited[i] = 1
+        if self.grid is not None:
+            self.grid.remove(i)
+
+    # Returns the (skips)-th nearest unvisited local index from 'current' and its distance
+    def nearest_unvisited(self, current: int, skips: int) -> tuple[int, float]:
+        # fast path: the sorted candidate list usually still holds enough unvisited points
+        visited = self.visited
+        found = 0
+        for candidate, dist in zip(self.candidates[current], self.candidate_distances[current]):
+            if not visited[candidate]:
+                if found == skips:
+                    return candidate, dist
+                found += 1
+
+        if self.matrix is not None:
+            unvisited = np.flatnonzero(~self.visited_mask)
+            if len(unvisited) == 0:
+                return None, float('inf')
+            row = self.matrix[current, unvisited]
+            # more skips than remaining points falls back to the nearest
+            position = int(np.argpartition(row, skips)[skips]) if skips < len(unvisited) else int(np.argmin(row))
+            return int(unvisited[position]), float(row[position])
+
+        nearest = self.grid.nearest(self.points[current, 0], self.points[current, 1], skips + 1)
+        if len(nearest) == 0:
+            return None, float('inf')
+        dist, candidate = nearest[skips] if skips < len(nearest) else nearest[0]
+        return candidate, dist
+
+    # closed route length for a list of local indexes, including the pad-to-first and last-to-pad legs
+    def route_length(self, route: list[int]) -> float:
+        if len(route) == 0:
+            return 0.0
+        route = np.asarray(route, dtype=np.intp)
+        if self.matrix is not None:
+            length = self.pad_distances[route[0]] + self.pad_distances[route[-1]]
+            return float(length + self.matrix[route[:-1], route[1:]].sum(dtype=np.float64))
+        return closed_route_length(self.points, self.pad, route)
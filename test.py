@@ -1,4 +1,11 @@
+import itertools
 from main import *
+from plotting import *
+from exact import solve_exact
+from local_search import improve_route
+from ruin_recreate import RuinAndRecreate
+from spatial import ClusterDistances
+from tour import RouteCosts, closed_route_length, closed_route_lengths
 
 def test_calculate_cluster_center(center, radius, num_points):
     x, y = generate_circle_points(center, radius, num_points)
@@ -38,6 +45,96 @@ def test_cluster_assignment(centers, radius, num_points, colors):
     plot_circles(centers, all_x, all_y, radius)
     plot_circles(centers, assigned_x, assigned_y, radius, colors)
 
+# seeded points and k-means++ batched restarts, so every run prints the same (correct) clustering
+def test_vectorized_k_means(centers, radius, num_points, seed = 0):
+    rng = np.random.default_rng(seed)
+    coordinate_list = []
+    for center in centers:
+        x, y = generate_circle_points(center, radius, num_points, rng)
+        coordinate_list.extend([Coordinate(x1, y1) for x1, y1 in zip(x, y)])
+    points = coordinates_to_array(coordinate_list)
+    center_array, labels, _, _ = k_means_adaptive_restarts(len(centers), points, seeding="kmeans++", rng=rng)
+    calculated_centers, clusters = array_to_coordinates(center_array), labels_to_clusters(labels, len(centers))
+    print(f"Expected centers: {[str(center) for center in centers]}")
+    print(f"Calculated centers: {[str(center) for center in calculated_centers]}")
+    print(f"Cluster sizes: {[len(cluster) for cluster in clusters.values()]}")
+    found = all(min(center.distanceTo(calculated) for calculated in calculated_centers) < 0.5 * radius for center in centers)
+    print(f"Every expected center found: {found}")
+    print(f"Loop SSE: {calculate_sum_squared_error(calculated_centers, clusters, coordinate_list):.3f}")
+
+# checks every RouteCosts delta against the closed length of the changed route, recomputed from scratch
+def test_route_costs(num_points, trials = 200, seed = 0):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 100, (num_points + 1, 2))
+    pad = points[-1]
+    route = rng.permutation(num_points).tolist()
+    costs = RouteCosts(points, pad, route)
+    length = closed_route_length(points, pad, route)
+    print(f"Route length: {costs.length:.6f} (expected {length:.6f})")
+    max_errors = {"reversal": 0.0, "move": 0.0, "removal": 0.0, "insertion": 0.0}
+    for _ in range(trials):
+        i, j = sorted(rng.integers(0, num_points, 2).tolist())
+        reversed_route = route[:i] + route[i:j+1][::-1] + route[j+1:]
+        expected = closed_route_length(points, pad, reversed_route) - length
+        max_errors["reversal"] = max(max_errors["reversal"], abs(float(costs.reversal_delta(i, j)) - expected))
+
+        # tour position k outside i..j+1, inserting after it
+        outside = [k for k in range(num_points + 1) if k < i or k > j + 1]
+        if outside:
+            k = int(rng.choice(outside))
+            reverse = bool(rng.integers(2))
+            segment = route[i:j+1][::-1] if reverse else route[i:j+1]
+            rest = route[:i] + route[j+1:]
+            at = k if k < i else k - len(segment)
+            moved_route = rest[:at] + segment + rest[at:]
+            expected = closed_route_length(points, pad, moved_route) - length
+            max_errors["move"] = max(max_errors["move"], abs(float(costs.move_delta(i, j, k, reverse)) - expected))
+
+        expected = length - closed_route_length(points, pad, route[:i] + route[i+1:])
+        max_errors["removal"] = max(max_errors["removal"], abs(float(costs.removal_gain(i)) - expected))
+
+    added = costs.insertion_costs(points[-1] + 1.0)
+    extended = np.vstack((points, points[-1] + 1.0))
+    for k in range(num_points + 1):
+        expected = closed_route_length(extended, pad, route[:k] + [num_points + 1] + route[k:]) - length
+        max_errors["insertion"] = max(max_errors["insertion"], abs(float(added[k]) - expected))
+    for name, error in max_errors.items():
+        print(f"Largest {name} delta error: {error:.2e}")
+
+    batch = np.array([rng.permutation(num_points) for _ in range(10)])
+    batch_lengths = closed_route_lengths(points, pad, batch)
+    expected = [closed_route_length(points, pad, candidate.tolist()) for candidate in batch]
+    print(f"Largest batch length error: {np.abs(batch_lengths - expected).max():.2e}")
+
+# compares the Held-Karp route of small random clusters against the shortest of every possible route
+def test_exact_routes(max_points = 8, seed = 0):
+    rng = np.random.default_rng(seed)
+    for num_points in range(1, max_points + 1):
+        points = rng.uniform(0, 100, (num_points, 2))
+        distances = ClusterDistances(points, list(range(num_points)), 50.0, 50.0)
+        route, length = solve_exact(distances)
+        brute_force = min(distances.route_length(list(order)) for order in itertools.permutations(range(num_points)))
+        visits_all = sorted(route) == list(range(num_points))
+        recomputed = closed_route_length(points, np.array([50.0, 50.0]), route)
+        print(f"N: {num_points}, Held-Karp: {length:.6f}, brute force: {brute_force:.6f}, route length: {recomputed:.6f}, visits every point: {visits_all}")
+
+# checks that ruin and recreate and local search return a route through every point of the cluster once,
+# with the length a Solution built from it records
+def test_route_search(num_points, iterations = 200, seed = 0):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 100, (num_points, 2))
+    cluster = rng.permutation(num_points)[:num_points // 2].tolist()
+    pad = Coordinate(50.0, 50.0)
+    distances = ClusterDistances(points, cluster, pad.get_x(), pad.get_y())
+    scalar_rng = random.Random(seed)
+    search = RuinAndRecreate(distances, start_route(distances, 0.10, scalar_rng, float('inf')), scalar_rng)
+    local_route, ruin_length = search.run(float('inf'), iterations)
+    ruin_route = distances.indexes[local_route].tolist()
+    improved_route, improved_length = improve_route(distances, rng.permutation(cluster).tolist(), float('inf'))
+    for name, route, length in (("Ruin and recreate", ruin_route, ruin_length), ("Local search", improved_route, improved_length)):
+        solution = create_solution(len(cluster), [pad], {0: cluster}, [(route, length)])
+        print(f"{name}: {length:.3f} meters, visits every point once: {sorted(route) == sorted(cluster)}, lengths match: {solution.route_lengths_match(points)}")
+
 
 if __name__ == "__main__":
     print("===TESTING CENTER FINDING===")
@@ -66,6 +163,27 @@ if __name__ == "__main__":
     test_calculate_squared_error(Coordinate(0, 0), 2, 128, trials=20)
     print()
 
+    print("===TESTING VECTORIZED K-MEANS===")
+    print("C: (0,0), (10,0), (0,10), R: 1, N: 64")
+    test_vectorized_k_means([Coordinate(0, 0), Coordinate(10, 0), Coordinate(0, 10)], 1, 64)
+    print()
+
+    print("===TESTING ROUTE COSTS===")
+    print("N: 12 and 200, every error should be about 0")
+    test_route_costs(12)
+    test_route_costs(200)
+    print()
+
+    print("===TESTING EXACT ROUTES===")
+    test_exact_routes(8)
+    print()
+
+    print("===TESTING ROUTE SEARCH===")
+    print("N: 40 and 600, half of them in the cluster")
+    test_route_search(40)
+    test_route_search(600)
+    print()
+
     print("===TESTING CLUSTER ASSIGNMENT===")
     print("First image is dataset, second is cluster assignment")
     test_cluster_assignment([Coordinate(0, 0), Coordinate(5, 0)], 1, 64,  ["green", "orange"])
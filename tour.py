@@ -0,0 +1,85 @@
+import numpy as np
+
+# Route evaluation shared by route search, Solution checks, landing pad placement and local search.
+# A closed route leaves the landing pad, visits 'route' (indexes into the point array) in order and flies back
+# to the pad. Whole routes are scored with one gather-and-diff over the point array, and RouteCosts keeps the
+# legs of one route so reversing or moving a segment, removing a point or inserting one is priced without
+# rebuilding the route.
+
+# distance between matching rows of 'a' and 'b', works for single points and (n, 2) arrays alike
+def _distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    diff = np.asarray(a) - np.asarray(b)
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+# closed route length from the landing pad through 'route' and back
+def closed_route_length(points: np.ndarray, pad: np.ndarray, route: list[int]) -> float:
+    if len(route) == 0:
+        return 0.0
+    tour = np.vstack((pad, points[route], pad))
+    legs = np.diff(tour, axis=0)
+    return float(np.hypot(legs[:, 0], legs[:, 1]).sum())
+
+# Closed lengths of many candidate routes through the same points at once, 'routes' is an (m, n) index array.
+# NOTE: builds an (m, n+2, 2) array, so score very large batches in chunks
+def closed_route_lengths(points: np.ndarray, pad: np.ndarray, routes: np.ndarray) -> np.ndarray:
+    routes = np.asarray(routes, dtype=np.intp)
+    if routes.ndim != 2:
+        print("ERROR: Candidate routes must be an (m, n) array of point indexes")
+        return None
+    if routes.shape[1] == 0:
+        return np.zeros(len(routes))
+    pads = np.broadcast_to(np.asarray(pad, dtype=np.float64), (len(routes), 1, 2))
+    legs = np.diff(np.concatenate((pads, points[routes], pads), axis=1), axis=1)
+    return np.hypot(legs[..., 0], legs[..., 1]).sum(axis=1)
+
+# Legs of one closed route and the O(1) cost of changing it.
+# Tour position 0 is the pad and tour position k+1 is route position k, legs[k] leaves tour position k
+# (legs[n] flies the last point back to the pad). Every delta is new length minus current length, so a
+# negative delta is an improvement. Route positions i and j may also be arrays to price many moves at once.
+# NOTE: the costs describe the route as it was built, rebuild after applying a move
+class RouteCosts:
+
+    def __init__(self, points: np.ndarray, pad: np.ndarray, route: list[int]):
+        self.points = points
+        self.route = np.asarray(route, dtype=np.intp)
+        self.size = len(self.route)
+        self.tour = np.vstack((np.asarray(pad, dtype=np.float64), points[self.route]))
+        self.legs = _distance(np.roll(self.tour, -1, axis=0), self.tour)
+        self.length = float(self.legs.sum()) if self.size > 0 else 0.0
+
+    # tour position after tour position 'k', wrapping back to the pad
+    def _next(self, k):
+        return (np.asarray(k) + 1) % (self.size + 1)
+
+    # change in length from reversing route positions i..j (i <= j)
+    def reversal_delta(self, i, j):
+        i, j = np.asarray(i), np.asarray(j)
+        before, first, last, after = self.tour[i], self.tour[i+1], self.tour[j+1], self.tour[self._next(j+1)]
+        return _distance(before, last) + _distance(first, after) - self.legs[i] - self.legs[j+1]
+
+    # how much shorter the route gets without the point at route position 'position'
+    def removal_gain(self, position):
+        position = np.asarray(position)
+        return self.legs[position] + self.legs[position+1] - _distance(self.tour[position], self.tour[self._next(position+1)])
+
+    # change in length from inserting 'point' at every route position (0..n), inserting at k puts it after tour[k]
+    def insertion_costs(self, point: np.ndarray) -> np.ndarray:
+        return _distance(self.tour, point) + _distance(np.roll(self.tour, -1, axis=0), point) - self.legs
+
+    # cheapest route position to insert 'point' at and how much longer the route gets
+    def cheapest_insertion(self, point: np.ndarray) -> tuple[int, float]:
+        added = self.insertion_costs(point)
+        position = int(np.argmin(added))
+        return position, float(added[position])
+
+    # Change in length from moving route positions i..j between tour position k and the one after it,
+    # reversed when 'reverse' is set (Or-opt)
+    # NOTE: tour position k must lie outside i..j+1, otherwise the edge it names is not in the shortened route
+    def move_delta(self, i, j, k, reverse: bool = False):
+        i, j, k = np.asarray(i), np.asarray(j), np.asarray(k)
+        before, first, last, after = self.tour[i], self.tour[i+1], self.tour[j+1], self.tour[self._next(j+1)]
+        u, v = self.tour[k], self.tour[self._next(k)]
+        removed = self.legs[i] + self.legs[j+1] - _distance(before, after)
+        if reverse:
+            first, last = last, first
+        return _distance(u, first) + _distance(last, v) - self.legs[k] - removed
@@ -1,72 +1,91 @@
-import matplotlib.pyplot as plot
+import io
 import numpy as np
 import os
+import random
 from coordinate import Coordinate
-from datetime import datetime
+from pointset import PointSet
+from datetime import datetime, timedelta
 
-def valid_file(file_name: str) -> bool:
+# Single-pass loader: validates and parses a location file with one read.
+# Returns None (after printing the error) when the file is invalid, 'max_nodes' of None means no limit.
+def load_locations(file_name: str, max_nodes: int = 4096) -> PointSet:
 
     # must be txt file
     if file_name[-4:] != ".txt":
         print("ERROR: File must be .txt type.")
-        return False
-    
-    # must exist to be read
-    if not os.path.isfile(file_name):
+        return None
+
+    try:
+        with open(file_name, "rb") as file:
+            data = file.read()
+    except (FileNotFoundError, IsADirectoryError):
         print(f"ERROR: {file_name} not found")
-        return False
+        return None
 
-    line_count = 0
-    with open(file_name, "r") as file:
-        data = file.read()
-        line_count = data.count('\n')
-    
-    # check coordinate count
-    if(line_count > 4096):
-        print(f"ERROR: There must be at most 4096 nodes in {file_name}")
-        return False
-    elif(line_count == 0):
+    if len(data.strip()) == 0:
         print(f"ERROR: {file_name} is empty")
-        return False
-    
-    return True
+        return None
+
+    coordinates = parse_location_data(data)
+    if coordinates is None:
+        return None
 
-def parse_input(file_name: str) -> list[Coordinate]:
-    coordinates:list[Coordinate] = []
-    index = 0
+    # check coordinate count
+    if max_nodes is not None and len(coordinates) > max_nodes:
+        print(f"ERROR: There must be at most {max_nodes} nodes in {file_name}")
+        return None
+
+    return coordinates
 
+# Parses the raw bytes of a location file, returns None (after printing the bad line) if a row is malformed
+def parse_location_data(data: bytes) -> PointSet:
+    lines = data.split(b"\n")
+    # a trailing newline does not start another line
+    if lines[-1] == b"":
+        lines.pop()
+
+    # fast path: one vectorized parse, accepted only if every line produced exactly one (x, y) row
     try:
-        with open(file_name, "r") as file:
-            while True:
-                line = file.readline()
-                index += 1
-
-                # readline returns "" when EOF
-                if line == "":
-                    break
-
-                coordinate_str = line.split()
-                if len(coordinate_str) != 2:
-                    print(f"ERROR: Improper coordinate formatting at line {index}")
-                    exit()
-                
-                try:
-                    x = float(coordinate_str[0])
-                    y = float(coordinate_str[1])
-
-                    # if x < 0 or y < 0:        # negative coordinates allowed per new information in Nov 9 email from Mr. Keogh
-                    #     print(f"ERROR: Negative coordinates at line {index}")
-                    #     exit()
-                except ValueError:
-                    print(f"ERROR: Improper coordinate at line {index}")
-                    exit()
-
-                coordinate = Coordinate(x,y)
-                coordinates.append(coordinate)
+        values = np.loadtxt(io.BytesIO(data), dtype=np.float64, comments=None, ndmin=2)
+        if values.shape == (len(lines), 2):
+            # stored the way Coordinate stores them, rounded to 3 decimals
+            return PointSet(np.round(values, 3))
+    except ValueError:
+        pass
+
+    # slow path: only malformed files get here, scan them line by line to report the exact line
+    coordinates:list[tuple[float, float]] = []
+    for index, line in enumerate(lines, start=1):
+        coordinate_str = line.split()
+        if len(coordinate_str) != 2:
+            print(f"ERROR: Improper coordinate formatting at line {index}")
+            return None
+        
+        try:
+            x = float(coordinate_str[0])
+            y = float(coordinate_str[1])
+
+            # if x < 0 or y < 0:        # negative coordinates allowed per new information in Nov 9 email from Mr. Keogh
+            #     print(f"ERROR: Negative coordinates at line {index}")
+            #     exit()
+        except ValueError:
+            print(f"ERROR: Improper coordinate at line {index}")
+            return None
+
+        coordinates.append((x, y))
+    return PointSet(np.round(np.array(coordinates, dtype=np.float64), 3))
+
+def parse_input(file_name: str) -> PointSet:
+    try:
+        with open(file_name, "rb") as file:
+            data = file.read()
     except FileNotFoundError:
         print(f"ERROR: {file_name} not found")
         exit()
-    
+
+    coordinates = parse_location_data(data)
+    if coordinates is None:
+        exit()
     return coordinates
 
 def parse_time(hour:int, minute:int):
@@ -97,20 +116,19 @@ def parse_time(hour:int, minute:int):
     time = f"{hour:02d}:{minute:02d}{meridiem}"
     return time
 
-def get_end_time():
-    dt = datetime.now()
-    current_time = dt.time()
-    hour, minute = (current_time.hour, current_time.minute)
-    minute_predict = minute + 5 # only given five minutes to compute
-    est_time = parse_time(hour, minute_predict)
+# clock time 'seconds' from now, rounded up to the next minute
+def get_end_time(seconds: float):
+    dt = datetime.now() + timedelta(seconds=seconds, minutes=1)
+    est_time = parse_time(dt.hour, dt.minute)
     return est_time
 
 def write_to_file(locations:list[int], file_name:str) -> bool:
     try:
+        # 1-based location numbers, built with one join and written with a single buffered write
+        numbers = (np.asarray(locations, dtype=np.int64) + 1).tolist()
+        lines = "\n".join(map(str, numbers)) + "\n" if numbers else ""
         with open(file_name, "w") as file:
-            for location in locations:
-                line = f"{location+1}\n"
-                file.write(line)
+            file.write(lines)
         return True
     except FileNotFoundError:
         print(f"ERROR: {file_name} could not be opened")
@@ -121,56 +139,31 @@ def get_root_name(file_name: str) -> str:
     root_name = os.path.splitext(file_name_w_ext)[0]
     return root_name
 
-# TODO: Create convert_solution_list() function which converts SOLUTION file to list of indexes 
-# corresponding to order of points visited in SOLUTION.
-# This will be utilized the same way as best_route in P1
-# RETURNS list[int]
+# Converts a SOLUTION file (one 1-based location number per line, as write_to_file writes them)
+# back into the 0-based list of indexes in the order the points are visited, like Solution.drone_routes.
+# Returns None (after printing the error) if the file is missing or malformed
 def convert_solution_list(file_name) -> list[int]:
-    return [0, 0] # stub
-
-# takes list of file_names and creates a unified "overall solution jpeg". Returns true if successful
-def generate_overall_graph(file_names:list[str], input_name) -> bool:
-    num_drones = len(file_names)
-    
-    drone_routes = []
-
-    plot_color_dict = ["pink", "green", "blue", "yellow"]
-
-    for index in num_drones:
-        file_name = file_names[index]
-        coordinates = parse_input(file_name)
-        # TODO: Create convert_solution_list() function which converts SOLUTION file to list of indexes 
-        # corresponding to order of points visited in SOLUTION.
-        # This will be utilized the same way as best_route in P1
-        
-        solution_coordinates = convert_solution_list(file_name) # NOTE: needs above implementation
-
-        x_coordinates, y_coordinates = get_plot_route(solution_coordinates)
-        plot.plot(x_coordinates, y_coordinates, color=f"{plot_color_dict[index]}", marker=f"Drone #{index+1}",)
-            
-    plot.title(input_name[:-4] + " Visualization")
-    plot.savefig(f"{input_name}_OVERALL_SOLUTION.jpeg")
-
-    return False
-
-
-def get_plot_route(route: list[int], coordinates: list[Coordinate]) -> tuple[list[int], list[int]]:
-    # need to isolate the x and y coordinates for matplot
-    x_coordinates = []
-    y_coordinates = []
-    for coord_idx in route:
-        x_coordinates.append(coordinates[coord_idx-1].get_x())
-        y_coordinates.append(coordinates[coord_idx-1].get_y())
-    return tuple[x_coordinates, y_coordinates]
+    try:
+        with open(file_name, "r") as file:
+            lines = file.read().split()
+    except FileNotFoundError:
+        print(f"ERROR: {file_name} not found")
+        return None
 
+    try:
+        route = [int(line) - 1 for line in lines]
+    except ValueError:
+        print(f"ERROR: Improper location number in {file_name}")
+        return None
+    return route
 
 # Adapted from Dr. Keogh's Slides sent via email on 11/9/2025
-def generate_circle_points(center: Coordinate, radius, num_points) -> tuple[list[float], list[float]]:
+def generate_circle_points(center: Coordinate, radius, num_points, rng: np.random.Generator = None) -> tuple[list[float], list[float]]:
     
     x_center, y_center = center.get_x(), center.get_y()
 
     # Generate random angles
-    angles = np.random.rand(num_points) * 2 * np.pi
+    angles = make_rng(rng).random(num_points) * 2 * np.pi
 
     # Generate points from angles
     x_coordinates = radius * np.cos(angles) + x_center
@@ -178,46 +171,31 @@ def generate_circle_points(center: Coordinate, radius, num_points) -> tuple[list
     
     return x_coordinates, y_coordinates
 
-def plot_circles(centers: list[Coordinate], x_coordinates: list[list[float]], y_coordinates: list[list[float]], radii: int, colors: list[str] = None):
-    # Plot for confirmation + report figures
-    plot.figure()
-    for idx, center in enumerate(centers):
-        x_center = center.get_x()
-        y_center = center.get_y()
-        circle_angles = np.linspace(0, 2*np.pi, 720)
-        circle_x = radii * np.cos(circle_angles) + x_center
-        circle_y = radii * np.sin(circle_angles) + y_center
-        if colors:
-            plot.scatter(x_coordinates[idx], y_coordinates[idx], color=colors[idx])
-        else:
-            plot.scatter(x_coordinates[idx], y_coordinates[idx], color='black')
-            plot.plot(circle_x, circle_y, 'b-')
-            plot.plot(x_center, y_center, 'gx')
-    plot.axis('equal')
-    plot.xlabel("X")
-    plot.ylabel("Y")
-    plot.show()
-
-def plot_clusters(clusters: list[int], coordinates: list[Coordinate]):
-    if len(clusters) < 4: return
-    colors = ["red", "green", "blue", "orange"]
-    for idx in range(len(clusters)):
-        x_coords = [coordinates[i].get_x() for i in clusters[idx]]
-        y_coords = [coordinates[i].get_y() for i in clusters[idx]]
-        plot.plot(x_coords, y_coords, color=colors[idx], marker="None")
-    
-    # 1950 x 1950 minimum
-    dpi = 200
-    min_w_pixels = 1920
-    min_h_pixels = 1920
-    figsize_w = min_w_pixels / dpi
-    figsize_h = min_h_pixels / dpi
-
-    # sets min dimensions as per instructions
-    plot.figure(figsize=(figsize_w, figsize_h), dpi=dpi)
-
-    # hide axes
-    plot.subplot().set_axis_off()
-
-    plot.show()
-        
+# converts a list of Coordinates into a single (N, 2) float array for vectorized math
+# NOTE: a PointSet already is one, so its array is returned without copying
+def coordinates_to_array(coordinates: list[Coordinate]) -> np.ndarray:
+    if isinstance(coordinates, PointSet):
+        return coordinates.array
+    return np.array([coordinate.loc for coordinate in coordinates], dtype=np.float64).reshape(-1, 2)
+
+# converts an (N, 2) float array back into a list of Coordinates
+def array_to_coordinates(points: np.ndarray) -> list[Coordinate]:
+    return [Coordinate(float(x), float(y)) for x, y in points]
+
+# Every stochastic routine takes an explicit generator so a whole run can be reproduced from one seed
+
+# returns a numpy Generator from an int seed, SeedSequence or existing Generator (None seeds from OS entropy)
+def make_rng(seed=None) -> np.random.Generator:
+    return np.random.default_rng(seed)
+
+# returns a random.Random for the scalar draws in route construction, Generator.random() per call is much slower
+def make_scalar_rng(rng: np.random.Generator) -> random.Random:
+    return random.Random(int(rng.integers(2**63)))
+
+# splits a seed into 'count' independent child SeedSequences, one per drone count / cluster / worker job
+def spawn_seeds(seed, count: int) -> list[np.random.SeedSequence]:
+    if isinstance(seed, np.random.Generator):
+        seed = int(seed.integers(2**63))
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(count)